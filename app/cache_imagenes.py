@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Configuración de la caché de imágenes (ajustable por variables de entorno)
+CACHE_TTL = float(os.environ.get("PPTX_CACHE_TTL", "3600"))  # Segundos sin revalidar
+CACHE_MEMORIA_BYTES = int(float(os.environ.get("PPTX_CACHE_MEMORIA_MB", "64")) * 1024 * 1024)
+CACHE_DISCO_BYTES = int(float(os.environ.get("PPTX_CACHE_DISCO_MB", "512")) * 1024 * 1024)
+CACHE_DIR = os.environ.get("PPTX_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pptx_cache_imagenes"))
+
+# Nivel en memoria: url -> entrada, en orden de uso (LRU)
+_memoria = OrderedDict()
+_memoria_bytes = 0
+_disco_bytes = None  # Se calcula al primer acceso al directorio
+_lock = threading.Lock()
+
+estadisticas = {
+    'hits_memoria': 0,
+    'hits_disco': 0,
+    'revalidaciones': 0,
+    'fallos': 0,
+}
+
+def _clave(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+def _rutas(url):
+    clave = _clave(url)
+    return os.path.join(CACHE_DIR, f"{clave}.img"), os.path.join(CACHE_DIR, f"{clave}.json")
+
+def esta_fresca(entrada):
+    """Indica si la entrada puede servirse sin consultar al servidor."""
+    return time.time() - entrada['guardado'] < CACHE_TTL
+
+def cabeceras_validacion(entrada):
+    """Cabeceras para una petición GET condicional a partir de una entrada cacheada."""
+    headers = {}
+    if entrada:
+        if entrada.get('etag'):
+            headers['If-None-Match'] = entrada['etag']
+        if entrada.get('last_modified'):
+            headers['If-Modified-Since'] = entrada['last_modified']
+    return headers
+
+def _guardar_memoria(url, entrada):
+    global _memoria_bytes
+    with _lock:
+        anterior = _memoria.pop(url, None)
+        if anterior:
+            _memoria_bytes -= len(anterior['bytes'])
+        if len(entrada['bytes']) > CACHE_MEMORIA_BYTES:
+            return
+        _memoria[url] = entrada
+        _memoria_bytes += len(entrada['bytes'])
+        # Expulsar las menos usadas hasta volver al límite
+        while _memoria_bytes > CACHE_MEMORIA_BYTES:
+            _, expulsada = _memoria.popitem(last=False)
+            _memoria_bytes -= len(expulsada['bytes'])
+
+def _escribir_atomico(ruta, contenido):
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, 'wb') as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+
+def _calcular_disco_bytes():
+    total = 0
+    for nombre in os.listdir(CACHE_DIR):
+        if nombre.endswith(".img"):
+            total += os.path.getsize(os.path.join(CACHE_DIR, nombre))
+    return total
+
+def _recortar_disco():
+    """Elimina del disco las imágenes usadas hace más tiempo hasta cumplir el límite."""
+    global _disco_bytes
+    archivos = []
+    for nombre in os.listdir(CACHE_DIR):
+        if nombre.endswith(".img"):
+            ruta = os.path.join(CACHE_DIR, nombre)
+            archivos.append((os.path.getmtime(ruta), os.path.getsize(ruta), ruta))
+    archivos.sort()
+    for _, tamano, ruta in archivos:
+        if _disco_bytes <= CACHE_DISCO_BYTES:
+            break
+        try:
+            os.remove(ruta)
+            os.remove(ruta[:-len(".img")] + ".json")
+        except OSError:
+            pass
+        _disco_bytes -= tamano
+
+def _guardar_disco(url, entrada, solo_meta=False):
+    global _disco_bytes
+    if CACHE_DISCO_BYTES <= 0:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        ruta_img, ruta_meta = _rutas(url)
+        meta = {k: entrada[k] for k in ('etag', 'last_modified', 'guardado')}
+        meta['url'] = url
+        if solo_meta and os.path.exists(ruta_img):
+            _escribir_atomico(ruta_meta, json.dumps(meta).encode('utf-8'))
+            return
+        with _lock:
+            if _disco_bytes is None:
+                _disco_bytes = _calcular_disco_bytes()
+            if os.path.exists(ruta_img):
+                _disco_bytes -= os.path.getsize(ruta_img)
+            _escribir_atomico(ruta_img, entrada['bytes'])
+            _escribir_atomico(ruta_meta, json.dumps(meta).encode('utf-8'))
+            _disco_bytes += len(entrada['bytes'])
+            if _disco_bytes > CACHE_DISCO_BYTES:
+                _recortar_disco()
+    except OSError as e:
+        logging.error(f"Error al escribir la caché de imágenes en disco para {url}: {e}")
+
+def _leer_disco(url):
+    ruta_img, ruta_meta = _rutas(url)
+    try:
+        with open(ruta_meta, 'rb') as f:
+            meta = json.loads(f.read())
+        with open(ruta_img, 'rb') as f:
+            contenido = f.read()
+        os.utime(ruta_img)  # Marca de uso reciente para el LRU en disco
+    except (OSError, ValueError):
+        return None
+    if meta.get('url') != url:
+        return None
+    return {
+        'bytes': contenido,
+        'etag': meta.get('etag'),
+        'last_modified': meta.get('last_modified'),
+        'guardado': meta.get('guardado', 0),
+    }
+
+def buscar(url):
+    """
+    Devuelve la entrada cacheada de una URL (nivel memoria y después disco),
+    o None si no está. La entrada puede no estar fresca: comprobar con esta_fresca.
+    """
+    with _lock:
+        entrada = _memoria.get(url)
+        if entrada:
+            _memoria.move_to_end(url)
+            estadisticas['hits_memoria'] += 1
+            return entrada
+
+    entrada = _leer_disco(url)
+    if entrada:
+        _guardar_memoria(url, entrada)
+        estadisticas['hits_disco'] += 1
+        return entrada
+
+    estadisticas['fallos'] += 1
+    return None
+
+def guardar(url, contenido, etag=None, last_modified=None):
+    """Guarda una imagen recién descargada en ambos niveles."""
+    entrada = {
+        'bytes': contenido,
+        'etag': etag,
+        'last_modified': last_modified,
+        'guardado': time.time(),
+    }
+    _guardar_memoria(url, entrada)
+    _guardar_disco(url, entrada)
+
+def revalidar(url, entrada):
+    """Marca como fresca una entrada tras una respuesta 304 Not Modified."""
+    estadisticas['revalidaciones'] += 1
+    entrada = dict(entrada, guardado=time.time())
+    _guardar_memoria(url, entrada)
+    _guardar_disco(url, entrada, solo_meta=True)
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.logo import version_logo
+from app.ppt_generator import VERSION_PLANTILLA
+
+# Caché de informes ya generados, para reintentos del mismo payload (ajustable por variables de entorno)
+RESULTADOS_TTL = float(os.environ.get("PPTX_RESULTADOS_TTL", "600"))  # Segundos; 0 la desactiva
+RESULTADOS_CACHE_BYTES = int(float(os.environ.get("PPTX_RESULTADOS_CACHE_MB", "128")) * 1024 * 1024)
+
+# clave -> (guardado, bytes del .pptx), en orden de uso (LRU)
+_memoria = OrderedDict()
+_memoria_bytes = 0
+_lock = threading.Lock()
+
+def activa():
+    return RESULTADOS_TTL > 0 and RESULTADOS_CACHE_BYTES > 0
+
+def clave(data):
+    """
+    Hash del payload en forma canónica (claves ordenadas, sin espacios) junto
+    con la versión de la plantilla y la del logo: el mismo informe da la
+    misma clave aunque llegue con otro orden de claves o formato, y un logo
+    nuevo deja de servir los informes generados con el anterior.
+    """
+    canonico = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(f"{VERSION_PLANTILLA}\n{version_logo()}\n{canonico}".encode('utf-8')).hexdigest()
+
+def _expulsar(clave_informe):
+    global _memoria_bytes
+    _, contenido = _memoria.pop(clave_informe)
+    _memoria_bytes -= len(contenido)
+
+def buscar(clave_informe):
+    """Devuelve los bytes del informe cacheado, o None si no está o ya caducó."""
+    with _lock:
+        entrada = _memoria.get(clave_informe)
+        if entrada is None:
+            return None
+        if time.time() - entrada[0] > RESULTADOS_TTL:
+            _expulsar(clave_informe)
+            return None
+        _memoria.move_to_end(clave_informe)
+        return entrada[1]
+
+def guardar(clave_informe, contenido):
+    """Guarda un informe generado, expulsando los caducados y después los menos usados."""
+    global _memoria_bytes
+    if len(contenido) > RESULTADOS_CACHE_BYTES:
+        return
+    ahora = time.time()
+    with _lock:
+        if clave_informe in _memoria:
+            _expulsar(clave_informe)
+        _memoria[clave_informe] = (ahora, contenido)
+        _memoria_bytes += len(contenido)
+        for caducada in [c for c, (guardado, _) in _memoria.items() if ahora - guardado > RESULTADOS_TTL]:
+            _expulsar(caducada)
+        while _memoria_bytes > RESULTADOS_CACHE_BYTES:
+            _expulsar(next(iter(_memoria)))
@@ -0,0 +1,84 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from app.logo import precargar_logo
+
+# Construcción de secciones en paralelo (ajustable por variables de entorno)
+SECCIONES_WORKERS = int(os.environ.get("PPTX_SECCIONES_WORKERS", "0"))  # Procesos; 0 lo desactiva
+SECCIONES_UMBRAL = int(os.environ.get("PPTX_SECCIONES_UMBRAL", "200"))  # Noticias a partir de las que compensa
+
+_ATRIBUTOS_RELACION = (qn('r:id'), qn('r:embed'), qn('r:link'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def disponible():
+    """
+    Indica si se pueden repartir secciones entre procesos. Dentro de un
+    trabajador de PPTX_POOL=process no se anida otro pool: ahí el
+    paralelismo ya lo dan los informes que se generan a la vez.
+    """
+    return SECCIONES_WORKERS > 0 and multiprocessing.parent_process() is None
+
+def obtener_pool():
+    """Pool de procesos para las secciones; se crea al primer uso y se comparte en el proceso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Sin fork: se crea desde un hilo del pool mientras otros pueden tener tomado un lock
+            # (p. ej. el de la plantilla), y un hijo que lo herede tomado se bloquearía para siempre
+            _pool = ProcessPoolExecutor(max_workers=SECCIONES_WORKERS, initializer=precargar_logo,
+                                        mp_context=multiprocessing.get_context("forkserver"))
+        return _pool
+
+def extraer_fragmento(slide):
+    """
+    Serializa una diapositiva para llevarla a otra presentación: índice de
+    su layout, XML y relaciones (hipervínculos externos e imágenes) en el
+    orden de sus rId.
+    """
+    layouts = slide.slide_layout.slide_master.slide_layouts
+    relaciones = []
+    for rId, rel in sorted(slide.part.rels.items(), key=lambda r: int(r[0][3:])):
+        if rel.reltype == RT.SLIDE_LAYOUT:
+            continue
+        if rel.is_external:
+            relaciones.append((rId, rel.reltype, rel.target_ref))
+        elif rel.reltype == RT.IMAGE:
+            relaciones.append((rId, RT.IMAGE, rel.target_part.blob))
+        else:
+            raise ValueError(f"Relación no admitida en un fragmento: {rel.reltype}")
+    return layouts.index(slide.slide_layout), etree.tostring(slide._element), relaciones
+
+def insertar_fragmento(pr, fragmento):
+    """
+    Añade al final de `pr` la diapositiva de un fragmento. Las relaciones se
+    recrean en su orden original, así que los rId (y las imágenes, que se
+    comparten por hash en el paquete) salen igual que al construirla aquí.
+    """
+    layout, xml, relaciones = fragmento
+    slide = pr.slides.add_slide(pr.slide_layouts[layout])
+    equivalencias = {}
+    for rId, reltype, destino in relaciones:
+        if reltype == RT.IMAGE:
+            _, equivalencias[rId] = slide.part.get_or_add_image_part(io.BytesIO(destino))
+        else:
+            equivalencias[rId] = slide.part.relate_to(destino, reltype, is_external=True)
+
+    original = parse_xml(xml)
+    for elemento in original.iter():
+        for atributo in _ATRIBUTOS_RELACION:
+            rId = elemento.get(atributo)
+            if rId is not None:
+                elemento.set(atributo, equivalencias[rId])
+    sld = slide._element
+    for hijo in list(sld):
+        sld.remove(hijo)
+    sld.extend(list(original))
+    return slide
@@ -0,0 +1,84 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Configuración del cliente HTTP compartido (ajustable por variables de entorno)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("PPTX_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("PPTX_HTTP_READ_TIMEOUT", "15"))
+HTTP_POOL_HOSTS = int(os.environ.get("PPTX_HTTP_POOL_HOSTS", "10"))  # Hosts distintos con pool propio
+HTTP_POOL_POR_HOST = int(os.environ.get("PPTX_HTTP_POOL_POR_HOST", "16"))  # Conexiones keep-alive por host
+HTTP_REINTENTOS = int(os.environ.get("PPTX_HTTP_REINTENTOS", "2"))
+HTTP_BACKOFF = float(os.environ.get("PPTX_HTTP_BACKOFF", "0.3"))  # Factor de espera exponencial entre reintentos
+
+estadisticas = {
+    'peticiones': 0,
+    'conexiones_nuevas': 0,
+    'conexiones_reutilizadas': 0,
+}
+_lock = threading.Lock()
+
+def _contar(clave):
+    with _lock:
+        estadisticas[clave] += 1
+
+class _ContadorConexiones:
+    """Cuenta cuántas conexiones se sacan del pool y cuántas hay que abrir de cero."""
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        # urllib3 deja la conexión sin socket hasta que se usa por primera vez
+        if getattr(conn, 'sock', None) is None:
+            _contar('conexiones_nuevas')
+        else:
+            _contar('conexiones_reutilizadas')
+        return conn
+
+class _HTTPPool(_ContadorConexiones, HTTPConnectionPool):
+    pass
+
+class _HTTPSPool(_ContadorConexiones, HTTPSConnectionPool):
+    pass
+
+class _AdaptadorContado(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _HTTPPool, 'https': _HTTPSPool}
+
+def _crear_sesion():
+    reintentos = Retry(
+        total=HTTP_REINTENTOS,
+        connect=HTTP_REINTENTOS,
+        read=HTTP_REINTENTOS,
+        status=HTTP_REINTENTOS,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,  # Tras agotar reintentos se devuelve la última respuesta
+    )
+    adaptador = _AdaptadorContado(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=HTTP_POOL_POR_HOST,
+        max_retries=reintentos,
+    )
+    sesion = requests.Session()
+    sesion.mount('http://', adaptador)
+    sesion.mount('https://', adaptador)
+    return sesion
+
+# Sesión única del proceso: reutiliza conexiones TCP/TLS entre descargas y solicitudes
+_sesion = _crear_sesion()
+
+def get(url, headers=None, timeout=None):
+    """
+    GET a través del pool compartido. `timeout` limita a la vez la conexión
+    y la lectura (útil para respetar plazos); por defecto se usan los
+    valores configurados.
+    """
+    connect, read = HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+    if timeout is not None:
+        connect, read = min(connect, timeout), min(read, timeout)
+    _contar('peticiones')
+    return _sesion.get(url, headers=headers, timeout=(connect, read))
@@ -0,0 +1,181 @@
+import codecs
+import json
+import re
+
+# Caracteres que interesan al buscar el final de un valor JSON
+_ESPACIOS = re.compile(r'[ \t\n\r]*')
+# Resto de una cadena ya abierta: se detiene en la comilla de cierre o en una barra al final del trozo
+_RESTO_CADENA = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+# Todo lo que no es un corchete o llave estructural, incluidas las cadenas completas
+_RELLENO = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+_DELIMITADOR = re.compile(r'[,}\]\s]')
+
+_decodificador = json.JSONDecoder()
+
+class LectorJSON:
+    """
+    Lee un objeto JSON a partir de trozos de bytes sin cargar el documento
+    entero: cada miembro se decodifica en cuanto llega completo y el texto
+    ya consumido se descarta.
+    """
+
+    def __init__(self, trozos):
+        self._trozos = iter(trozos)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._agotado = False
+
+    def _leer_mas(self):
+        """Devuelve el siguiente trozo decodificado ('' si ya no quedan)."""
+        while not self._agotado:
+            trozo = next(self._trozos, None)
+            if trozo is None:
+                self._agotado = True
+                texto = self._utf8.decode(b'', final=True)
+            else:
+                texto = self._utf8.decode(trozo)
+            if texto:
+                return texto
+        return ''
+
+    def siguiente(self):
+        """Devuelve el siguiente carácter significativo sin consumirlo ('' al final)."""
+        while True:
+            self._pos = _ESPACIOS.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            # Todo lo leído era espacio: el trozo nuevo sustituye al buffer
+            self._buffer, self._pos = self._leer_mas(), 0
+            if not self._buffer:
+                return ''
+
+    def consumir(self, caracter):
+        if self.siguiente() != caracter:
+            raise ValueError(f"JSON no válido: se esperaba '{caracter}' en la entrada")
+        self._pos += 1
+
+    def _fin_valor(self):
+        """
+        Índice donde termina el valor que empieza en la posición actual. Los
+        trozos que hagan falta se escanean según llegan y se unen al buffer
+        una sola vez, al encontrar el final.
+        """
+        partes = [self._buffer[self._pos:]]
+        texto, i, desplazamiento = partes[0], 0, 0
+        fin = None
+        if texto[0] not in '{["':
+            # Número, true, false o null: termina en el siguiente delimitador
+            while fin is None:
+                encontrado = _DELIMITADOR.search(texto, i)
+                if encontrado:
+                    fin = desplazamiento + encontrado.start()
+                    break
+                desplazamiento += len(texto)
+                texto, i = self._leer_mas(), 0
+                if not texto:
+                    fin = desplazamiento
+                else:
+                    partes.append(texto)
+        else:
+            # Una cadena suelta (clave o valor) se escanea directamente desde su comilla
+            profundidad, en_cadena, escapado = 0, texto[0] == '"', False
+            i = 1 if en_cadena else 0
+            while fin is None:
+                while i < len(texto):
+                    if escapado:
+                        # La barra cerró el trozo anterior: el carácter escapado abre este
+                        escapado = False
+                        i += 1
+                    elif en_cadena:
+                        i = _RESTO_CADENA.match(texto, i).end()
+                        if i == len(texto):
+                            break
+                        escapado = texto[i] == '\\'
+                        en_cadena = escapado
+                        i += 1
+                        if not en_cadena and profundidad == 0:
+                            fin = desplazamiento + i
+                            break
+                    else:
+                        i = _RELLENO.match(texto, i).end()
+                        if i == len(texto):
+                            break
+                        caracter = texto[i]
+                        i += 1
+                        if caracter == '"':
+                            # Cadena cortada por el final del trozo
+                            en_cadena = True
+                            continue
+                        profundidad += 1 if caracter in '{[' else -1
+                        if profundidad == 0:
+                            fin = desplazamiento + i
+                            break
+                if fin is None:
+                    desplazamiento += len(texto)
+                    texto, i = self._leer_mas(), 0
+                    if not texto:
+                        if en_cadena or escapado:
+                            raise ValueError("JSON no válido: la entrada terminó antes de cerrar una cadena")
+                        raise ValueError("JSON no válido: la entrada terminó antes de cerrar un valor")
+                    partes.append(texto)
+
+        # El texto ya consumido se descarta al unir
+        self._buffer = ''.join(partes)
+        self._pos = 0
+        return fin
+
+    def valor(self):
+        """Decodifica y consume el siguiente valor completo."""
+        if not self.siguiente():
+            raise ValueError("JSON no válido: la entrada terminó antes de tiempo")
+        fin = self._fin_valor()
+        try:
+            valor, final = _decodificador.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON no válido: {e.msg}") from e
+        if final != fin:
+            raise ValueError("JSON no válido: contenido inesperado tras un valor")
+        self._pos = fin
+        return valor
+
+    def miembros(self):
+        """Genera (clave, valor) de un objeto, decodificando un miembro cada vez."""
+        self.consumir('{')
+        if self.siguiente() == '}':
+            self._pos += 1
+            return
+        while True:
+            clave = self.valor()
+            if not isinstance(clave, str):
+                raise ValueError("JSON no válido: las claves deben ser cadenas")
+            self.consumir(':')
+            yield clave, self.valor()
+            if self.siguiente() == '}':
+                self._pos += 1
+                return
+            self.consumir(',')
+
+def miembros_informe(trozos):
+    """
+    Genera (clave, valor) del objeto principal del informe a medida que se
+    recibe el cuerpo. Acepta el objeto directamente o dentro de una lista,
+    como generar_pptx (solo se usa el primer elemento).
+    """
+    lector = LectorJSON(trozos)
+    inicio = lector.siguiente()
+    if inicio not in ('[', '{'):
+        raise ValueError("Input data must be a list or dict.")
+    if inicio == '[':
+        lector.consumir('[')
+        if lector.siguiente() != '{':
+            raise ValueError("No se pudo extraer el objeto de datos principal.")
+    yield from lector.miembros()
+    if inicio == '[':
+        # El resto de elementos se valida como json.loads aunque no se use
+        while lector.siguiente() == ',':
+            lector.consumir(',')
+            lector.valor()
+        lector.consumir(']')
+    if lector.siguiente():
+        raise ValueError("JSON no válido: contenido inesperado tras el informe")
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from app import http_client
+from app.utils import dimensiones_imagen
+
+# URLs del logo de MMI (la segunda es la alternativa si falla la primera)
+LOGO_URLS = [
+    "https://mmi-e.com/wp-content/uploads/2023/03/LogoMMI_1024x1024.png",
+    "https://mmi-e.com/wp-content/uploads/2020/09/logo-mmi.png",
+]
+
+# Copia local incluida con la aplicación, usada mientras no haya una versión descargada
+LOGO_LOCAL = os.environ.get(
+    "PPTX_LOGO_PATH",
+    os.path.join(os.path.dirname(__file__), "assets", "logo_mmi.png"),
+)
+LOGO_REFRESCO = float(os.environ.get("PPTX_LOGO_REFRESCO", "86400"))  # Segundos entre descargas
+LOGO_REINTENTO = 300  # Segundos hasta reintentar tras un fallo de red
+
+# Estado compartido por todas las diapositivas y solicitudes del proceso
+_logo = {
+    'bytes': None,
+    'tamano': None,           # (ancho_px, alto_px)
+    'origen': None,
+    'version': None,          # Hash corto del contenido, para invalidar lo generado con otro logo
+    'inicializado': False,
+    'refrescando': False,
+    'proximo_refresco': 0.0,
+}
+_lock = threading.Lock()
+
+def _guardar(contenido, origen):
+    """Valida la imagen, calcula sus dimensiones y la publica en la caché."""
+    tamano = dimensiones_imagen(contenido)
+    version = hashlib.sha256(contenido).hexdigest()[:16]
+    with _lock:
+        _logo.update(bytes=contenido, tamano=tamano, origen=origen, version=version)
+    logging.info(f"Logo cargado desde {origen} ({len(contenido)} bytes, {tamano[0]}x{tamano[1]} px)")
+
+def _cargar_local():
+    if not os.path.exists(LOGO_LOCAL):
+        # Sin copia local los informes salen sin logo hasta que termine la descarga
+        logging.error(f"No hay logo local en {LOGO_LOCAL}: los informes no llevarán logo hasta descargarlo")
+        return
+    try:
+        with open(LOGO_LOCAL, 'rb') as f:
+            _guardar(f.read(), LOGO_LOCAL)
+    except Exception as e:
+        logging.error(f"Error al cargar el logo local {LOGO_LOCAL}: {e}")
+
+def _descargar():
+    """Descarga el logo (con URL alternativa) y programa el siguiente refresco."""
+    espera = LOGO_REINTENTO
+    try:
+        for url in LOGO_URLS:
+            try:
+                logging.info(f"Descargando logo desde {url}")
+                response = http_client.get(url)
+                if response.status_code == 200 and response.content:
+                    _guardar(response.content, url)
+                    espera = LOGO_REFRESCO
+                    break
+                logging.error(f"Error al descargar logo {url}: {response.status_code}")
+            except Exception as e:
+                logging.error(f"Error al descargar logo {url}: {e}")
+    finally:
+        with _lock:
+            _logo['refrescando'] = False
+            _logo['proximo_refresco'] = time.monotonic() + espera
+
+def _lanzar_refresco():
+    with _lock:
+        if _logo['refrescando']:
+            return
+        _logo['refrescando'] = True
+    threading.Thread(target=_descargar, name="logo-refresco", daemon=True).start()
+
+def precargar_logo():
+    """
+    Carga la copia local del logo y lanza su descarga en segundo plano.
+    Pensado para llamarse al arrancar; si no se llama, se hace en el primer uso.
+    """
+    with _lock:
+        if _logo['inicializado']:
+            return
+        _logo['inicializado'] = True
+    _cargar_local()
+    _lanzar_refresco()
+
+def obtener_logo():
+    """
+    Devuelve (bytes, (ancho_px, alto_px)) del logo, o None si aún no hay
+    ninguno disponible. Nunca espera a la red: los refrescos van en segundo plano.
+    """
+    if not _logo['inicializado']:
+        precargar_logo()
+    elif time.monotonic() >= _logo['proximo_refresco']:
+        _lanzar_refresco()
+
+    with _lock:
+        if _logo['bytes'] is None:
+            return None
+        return _logo['bytes'], _logo['tamano']
+
+def version_logo():
+    """Identifica el logo en uso (None si aún no hay ninguno), sin lanzar descargas."""
+    with _lock:
+        return _logo['version']
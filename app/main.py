@@ -1,13 +1,454 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import collections
+import json
+import logging
+import multiprocessing
+import os
+import io
+import tempfile
+import time
+from functools import partial
 import uuid
-from app.ppt_generator import generar_pptx
+import zipfile
+from app.ppt_generator import (
+    GRAFICOS_DEADLINE, generar_pptx, generar_pptx_bytes, generar_pptx_incremental, urls_a_descargar,
+)
+from app.ingesta import miembros_informe
+from app.modelo import Informe
+from app.utils import prefetch_imagenes
+from app.logo import precargar_logo
+from app import cache_imagenes, cache_informes, http_client, metricas, trabajos
 
-app = FastAPI()
+# Configuración del pool de generación (ajustable por variables de entorno)
+POOL_TIPO = os.environ.get("PPTX_POOL", "thread")  # "thread" o "process"
+POOL_WORKERS = int(os.environ.get("PPTX_WORKERS", "4"))
+POOL_MAX_COLA = int(os.environ.get("PPTX_MAX_COLA", "8"))  # Trabajos en espera además de los que se ejecutan
+JOB_TIMEOUT = float(os.environ.get("PPTX_JOB_TIMEOUT", "120"))  # Segundos por informe
+RETRY_AFTER = "5"
+LOTE_MAX = int(os.environ.get("PPTX_LOTE_MAX", "50"))  # Informes por llamada a /generar-pptx/lote
+# Cuerpos mayores (o sin Content-Length) se leen por partes en lugar de con request.json()
+INGESTA_UMBRAL = int(float(os.environ.get("PPTX_INGESTA_UMBRAL_MB", "1")) * 1024 * 1024)
+
+PPTX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+CHUNK_SIZE = 64 * 1024
+DEGRADADOS_CABECERA = 20  # Gráficos degradados detallados como máximo en la cabecera de respuesta
+
+def crear_executor():
+    """Crea el pool de trabajadores donde se ejecuta la generación bloqueante."""
+    if POOL_TIPO == "process":
+        # Sin fork, para no heredar locks tomados por otros hilos (ver app.fragmentos.obtener_pool)
+        return ProcessPoolExecutor(max_workers=POOL_WORKERS, initializer=precargar_logo,
+                                   mp_context=multiprocessing.get_context("forkserver"))
+    return ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix="pptx")
+
+executor = crear_executor()
+
+# Trabajos admitidos (en ejecución + en cola). Solo se modifica desde el event loop.
+trabajos_admitidos = 0
+# Lotes esperando un hueco en el pool (futures del event loop), por orden de llegada
+esperas_hueco = collections.deque()
+# Informes en construcción por clave de payload (ver generar_con_cache). Solo desde el event loop.
+informes_en_curso = {}
+
+@asynccontextmanager
+async def lifespan(app):
+    precargar_logo()
+    yield
+    executor.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
+
+def hay_capacidad():
+    return trabajos_admitidos < POOL_WORKERS + POOL_MAX_COLA
+
+async def esperar_hueco():
+    """Espera a que el pool admita un trabajo más, sin rechazar con 503 (informes de un lote)."""
+    while not hay_capacidad():
+        espera = asyncio.get_running_loop().create_future()
+        esperas_hueco.append(espera)
+        await espera
+
+def comprobar_capacidad():
+    """Rechaza con 503 si el pool y su cola están llenos."""
+    if not hay_capacidad():
+        logging.warning(f"Pool saturado ({trabajos_admitidos} trabajos), rechazando solicitud")
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado generando otros informes, inténtelo más tarde",
+            headers={"Retry-After": RETRY_AFTER},
+        )
+
+def enviar_al_pool(func, *args, comprobar=True):
+    """
+    Admite un trabajo en el pool y devuelve su future. Rechaza con 503 si
+    el pool y su cola están llenos, salvo que el llamante ya lo haya
+    comprobado (comprobar=False). Debe llamarse desde el event loop.
+    """
+    global trabajos_admitidos
+    if comprobar:
+        comprobar_capacidad()
+
+    loop = asyncio.get_running_loop()
+    trabajos_admitidos += 1
+    future = executor.submit(func, *args)
+
+    def liberar(_):
+        global trabajos_admitidos
+        trabajos_admitidos -= 1
+        # Despierta al primer lote que siga esperando un hueco
+        while esperas_hueco:
+            espera = esperas_hueco.popleft()
+            if not espera.done():
+                espera.set_result(None)
+                break
+
+    # El hueco se libera cuando el trabajo termina de verdad, no cuando expira el timeout
+    future.add_done_callback(lambda f: loop.call_soon_threadsafe(liberar, f))
+    return future
+
+async def ejecutar_en_pool(func, *args):
+    """
+    Ejecuta una función bloqueante en el pool sin congelar el event loop.
+    Rechaza con 503 si el pool está lleno, y con 504 si el trabajo supera JOB_TIMEOUT.
+    """
+    future = enviar_al_pool(func, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=JOB_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Si aún estaba en cola se descarta; si ya se ejecuta, terminará en segundo plano
+        future.cancel()
+        logging.error(f"Timeout de {JOB_TIMEOUT}s generando informe")
+        raise HTTPException(status_code=504, detail="La generación del informe superó el tiempo máximo")
+
+def generar_en_worker(data, limite=None):
+    """
+    Genera el informe dentro del pool y devuelve (resultado, degradados). Con
+    procesos el resultado son bytes, ya que un archivo temporal no puede
+    cruzar el límite entre procesos.
+    """
+    degradados = []
+    if POOL_TIPO == "process":
+        return generar_pptx_bytes(data, limite=limite, degradados=degradados), degradados
+    return generar_pptx(data, limite=limite, degradados=degradados), degradados
+
+def generar_bytes_en_worker(informe, imagenes):
+    """Genera un informe del lote con sus imágenes ya descargadas. Devuelve (bytes, degradados)."""
+    degradados = []
+    return generar_pptx_bytes(informe, imagenes, degradados=degradados), degradados
+
+def generar_incremental_en_worker(origen, limite=None):
+    """
+    Genera el informe leyendo el cuerpo por partes. Con hilos `origen` es un
+    iterador sobre el cuerpo de la solicitud; con procesos, la ruta del
+    archivo temporal donde se volcó, que se borra al terminar.
+    Devuelve (resultado, degradados) como generar_en_worker.
+    """
+    degradados = []
+    if POOL_TIPO != "process":
+        return generar_pptx_incremental(miembros_informe(origen), limite=limite, degradados=degradados), degradados
+    try:
+        with open(origen, 'rb') as f:
+            miembros = miembros_informe(iter(partial(f.read, CHUNK_SIZE), b''))
+            with generar_pptx_incremental(miembros, io.BytesIO(), limite=limite, degradados=degradados) as salida:
+                return salida.getvalue(), degradados
+    finally:
+        os.remove(origen)
+
+async def construir_informe(clave, informe, limite):
+    """Genera el informe en el pool, lo pasa a bytes y lo cachea si salió completo."""
+    resultado, degradados = await ejecutar_en_pool(generar_en_worker, informe, limite)
+    if not isinstance(resultado, bytes):
+        with resultado:
+            resultado = resultado.read()
+    # Con gráficos degradados o sin logo (anotado por el worker que lo generó) no se cachea:
+    # un reintento puede conseguirlos
+    if not degradados:
+        cache_informes.guardar(clave, resultado)
+    return resultado, degradados
+
+def terminar_construccion(clave, tarea):
+    informes_en_curso.pop(clave, None)
+    if not tarea.cancelled():
+        tarea.exception()  # Marca el error como recogido aunque ya nadie espere
+
+async def generar_con_cache(clave, informe, limite):
+    """
+    Devuelve (bytes, degradados) desde la caché de informes o generándolo.
+    Las solicitudes idénticas que llegan mientras se construye esperan a esa
+    misma construcción en lugar de lanzar otra en el pool.
+    """
+    contenido = cache_informes.buscar(clave)
+    if contenido is not None:
+        metricas.incrementar('pptx_cache_informes_total', resultado='hit')
+        return contenido, []
+
+    tarea = informes_en_curso.get(clave)
+    if tarea is not None:
+        metricas.incrementar('pptx_cache_informes_total', resultado='compartido')
+    else:
+        metricas.incrementar('pptx_cache_informes_total', resultado='fallo')
+        tarea = asyncio.ensure_future(construir_informe(clave, informe, limite))
+        informes_en_curso[clave] = tarea
+        tarea.add_done_callback(partial(terminar_construccion, clave))
+    # Si una solicitud se cancela (cliente desconectado), la construcción sigue para las demás
+    return await asyncio.shield(tarea)
+
+def es_cuerpo_grande(request):
+    longitud = request.headers.get('content-length')
+    return longitud is None or int(longitud) > INGESTA_UMBRAL
+
+def trozos_del_cuerpo(request, loop):
+    """Iterador síncrono sobre el cuerpo de la solicitud, para consumirlo desde un hilo del pool."""
+    flujo = request.stream()
+
+    async def siguiente():
+        return await flujo.__anext__()
+
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(siguiente(), loop).result(timeout=JOB_TIMEOUT)
+        except StopAsyncIteration:
+            return
+
+async def volcar_cuerpo(request):
+    """Vuelca el cuerpo a un archivo temporal (un stream no puede cruzar a otro proceso)."""
+    with tempfile.NamedTemporaryFile(prefix="pptx_cuerpo_", suffix=".json", delete=False) as f:
+        try:
+            async for chunk in request.stream():
+                f.write(chunk)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    return f.name
+
+async def generar_desde_cuerpo(request):
+    """
+    Lanza la generación según el tamaño del cuerpo: los pequeños se decodifican
+    de una vez; los grandes se procesan bloque a bloque mientras llegan.
+    El informe debe estar listo antes de JOB_TIMEOUT desde que llega la
+    solicitud (cola incluida): si no, sale con los gráficos pendientes degradados.
+    Los cuerpos pequeños pasan por la caché de informes; los grandes no, ya
+    que su clave solo se conoce tras leerlos enteros.
+    """
+    limite = time.time() + JOB_TIMEOUT
+    if not es_cuerpo_grande(request):
+        # Validación en el borde: un payload mal formado no llega a ocupar el pool
+        data = await request.json()
+        informe = Informe.desde_json(data)
+        if cache_informes.activa():
+            return await generar_con_cache(cache_informes.clave(data), informe, limite)
+        return await ejecutar_en_pool(generar_en_worker, informe, limite)
+
+    if POOL_TIPO != "process":
+        return await ejecutar_en_pool(
+            generar_incremental_en_worker, trozos_del_cuerpo(request, asyncio.get_running_loop()), limite)
+
+    comprobar_capacidad()  # Antes de volcar a disco un cuerpo que se rechazaría
+    ruta = await volcar_cuerpo(request)
+    try:
+        return await ejecutar_en_pool(generar_incremental_en_worker, ruta, limite)
+    except HTTPException as e:
+        if e.status_code == 503 and os.path.exists(ruta):
+            os.remove(ruta)
+        raise
+
+def respuesta_pptx(resultado, nombre_archivo, degradados=()):
+    """
+    Envía la presentación por trozos y cierra (y borra) el archivo al terminar.
+    Los gráficos sustituidos por un aviso se indican en las cabeceras
+    X-Graficos-Degradados (cuántos) y X-Graficos-Degradados-Detalle (JSON).
+    """
+    archivo = io.BytesIO(resultado) if isinstance(resultado, bytes) else resultado
+    archivo.seek(0, io.SEEK_END)
+    tamano = archivo.tell()
+    archivo.seek(0)
+
+    cabeceras = {
+        'Content-Disposition': f'attachment; filename="{nombre_archivo}"',
+        'Content-Length': str(tamano),
+        'X-Graficos-Degradados': str(len(degradados)),
+    }
+    if degradados:
+        cabeceras['X-Graficos-Degradados-Detalle'] = json.dumps(degradados[:DEGRADADOS_CABECERA])
+
+    def trozos():
+        while True:
+            chunk = archivo.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    return StreamingResponse(
+        trozos(),
+        media_type=PPTX_MEDIA_TYPE,
+        headers=cabeceras,
+        background=BackgroundTask(archivo.close),
+    )
 
 @app.post("/generar-pptx")
 async def generar_pptx_endpoint(request: Request):
-    data = await request.json()
     nombre_archivo = f"reporte_{uuid.uuid4()}.pptx"
-    ruta_pptx = generar_pptx(data, nombre_archivo)
-    return FileResponse(ruta_pptx, media_type='application/vnd.openxmlformats-officedocument.presentationml.presentation', filename=nombre_archivo)
+    try:
+        resultado, degradados = await generar_desde_cuerpo(request)
+    except ValueError as e:
+        metricas.incrementar('pptx_solicitudes_total', estado=422)
+        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException as e:
+        metricas.incrementar('pptx_solicitudes_total', estado=e.status_code)
+        raise
+    metricas.incrementar('pptx_solicitudes_total', estado=200)
+    if degradados:
+        logging.warning(f"Informe {nombre_archivo} generado con {len(degradados)} gráficos degradados")
+    return respuesta_pptx(resultado, nombre_archivo, degradados)
+
+class BufferZip(io.RawIOBase):
+    """Destino no posicionable para zipfile: acumula lo escrito hasta que se vacía."""
+
+    def __init__(self):
+        self.datos = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, contenido):
+        self.datos += contenido
+        return len(contenido)
+
+    def vaciar(self):
+        contenido = bytes(self.datos)
+        self.datos.clear()
+        return contenido
+
+@app.post("/generar-pptx/lote")
+async def generar_lote_endpoint(request: Request):
+    """
+    Genera varios informes en una sola llamada y los devuelve en un ZIP que
+    se envía a medida que cada informe termina. Las imágenes comunes se
+    descargan una sola vez para todo el lote.
+    """
+    lote = await request.json()
+    if not isinstance(lote, list) or not lote:
+        raise HTTPException(status_code=422, detail="Se esperaba una lista de informes")
+    if len(lote) > LOTE_MAX:
+        raise HTTPException(status_code=413, detail=f"El lote supera el máximo de {LOTE_MAX} informes")
+    informes = []
+    for i, payload in enumerate(lote):
+        try:
+            informes.append(Informe.desde_json(payload))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Informe {i + 1}: {e}")
+    comprobar_capacidad()
+
+    # Descarga única de todas las URLs del lote (prefetch_imagenes elimina duplicados)
+    todas = [url for informe in informes for url in urls_a_descargar(informe)]
+    imagenes = await asyncio.to_thread(prefetch_imagenes, todas, GRAFICOS_DEADLINE)
+    logging.info(f"Lote de {len(lote)} informes: {len(imagenes)} imágenes únicas de {len(todas)} referencias")
+
+    async def contenido_zip():
+        buffer = BufferZip()
+        pendientes = {}
+        siguiente = 0
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+            while siguiente < len(informes) or pendientes:
+                # Ventana de POOL_WORKERS informes en paralelo, cada uno con su hueco en el pool:
+                # si está lleno se espera a que termine un informe propio o, sin ninguno, a un hueco
+                while siguiente < len(informes) and len(pendientes) < POOL_WORKERS:
+                    if not hay_capacidad():
+                        if pendientes:
+                            break
+                        await esperar_hueco()
+                        continue
+                    informe = informes[siguiente]
+                    propias = {url: imagenes.get(url) for url in urls_a_descargar(informe)}
+                    future = enviar_al_pool(generar_bytes_en_worker, informe, propias, comprobar=False)
+                    pendientes[asyncio.wrap_future(future)] = (siguiente, time.monotonic() + JOB_TIMEOUT, future)
+                    siguiente += 1
+
+                plazo = min(limite for _, limite, _ in pendientes.values()) - time.monotonic()
+                hechos, _ = await asyncio.wait(pendientes, timeout=max(0, plazo), return_when=asyncio.FIRST_COMPLETED)
+                ahora = time.monotonic()
+                vencidos = [f for f in pendientes if f not in hechos and pendientes[f][1] <= ahora]
+                for future in [*hechos, *vencidos]:
+                    indice, _, original = pendientes.pop(future)
+                    nombre = f"informe_{indice + 1:03d}"
+                    if future in vencidos:
+                        # Si aún estaba en cola se descarta; si ya se ejecuta, terminará en segundo plano
+                        original.cancel()
+                        logging.error(f"Timeout de {JOB_TIMEOUT}s generando {nombre} del lote")
+                        zf.writestr(f"{nombre}.error.txt", "La generación del informe superó el tiempo máximo")
+                        yield buffer.vaciar()
+                        continue
+                    try:
+                        contenido, degradados = future.result()
+                        zf.writestr(f"{nombre}.pptx", contenido)
+                        if degradados:
+                            zf.writestr(f"{nombre}.degradados.json", json.dumps(degradados, ensure_ascii=False))
+                    except Exception as e:
+                        logging.error(f"Error generando {nombre} del lote: {e}")
+                        zf.writestr(f"{nombre}.error.txt", str(e))
+                    yield buffer.vaciar()
+        yield buffer.vaciar()  # Directorio central del ZIP
+
+    return StreamingResponse(
+        contenido_zip(),
+        media_type="application/zip",
+        headers={'Content-Disposition': f'attachment; filename="informes_{uuid.uuid4()}.zip"'},
+    )
+
+@app.post("/jobs", status_code=202)
+async def crear_trabajo_endpoint(request: Request):
+    """Encola un informe y devuelve su id al instante; el resultado se consulta en /jobs/{id}."""
+    try:
+        informe = Informe.desde_json(await request.json())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # SQLite y el disco pueden bloquear (timeout de 10 s): fuera del event loop
+    await asyncio.to_thread(trabajos.purgar_expirados)
+    trabajo_id = await asyncio.to_thread(trabajos.crear)
+    try:
+        enviar_al_pool(trabajos.ejecutar, trabajo_id, informe)
+    except HTTPException:
+        await asyncio.to_thread(trabajos.actualizar_estado, trabajo_id, 'rechazado')
+        raise
+    return {"id": trabajo_id, "estado": "pendiente", "url": f"/jobs/{trabajo_id}"}
+
+@app.get("/jobs/{trabajo_id}")
+async def estado_trabajo_endpoint(trabajo_id: str):
+    trabajo = await asyncio.to_thread(trabajos.obtener, trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    if trabajo['estado'] == 'completado':
+        trabajo['url_archivo'] = f"/jobs/{trabajo_id}/file"
+    return trabajo
+
+@app.get("/jobs/{trabajo_id}/file")
+async def archivo_trabajo_endpoint(trabajo_id: str):
+    trabajo = await asyncio.to_thread(trabajos.obtener, trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    if trabajo['estado'] != 'completado':
+        raise HTTPException(status_code=409, detail=f"El trabajo está en estado '{trabajo['estado']}'")
+    try:
+        archivo = await asyncio.to_thread(open, trabajos.ruta_resultado(trabajo_id), 'rb')
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return respuesta_pptx(archivo, f"reporte_{trabajo_id}.pptx", trabajo['degradados'])
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Métricas en formato Prometheus. Con PPTX_POOL=process las fases se miden
+    dentro de cada proceso trabajador y no aparecen aquí.
+    """
+    metricas.fijar('pptx_trabajos_admitidos', trabajos_admitidos)
+    for resultado, valor in cache_imagenes.estadisticas.items():
+        metricas.fijar('pptx_cache_imagenes_total', valor, resultado=resultado)
+    for tipo, valor in http_client.estadisticas.items():
+        metricas.fijar('pptx_http_total', valor, tipo=tipo)
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
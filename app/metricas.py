@@ -0,0 +1,153 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Límites de los buckets de los histogramas
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_BYTES = (1024, 10 * 1024, 50 * 1024, 100 * 1024, 250 * 1024, 500 * 1024,
+                 1024 ** 2, 2.5 * 1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2, 25 * 1024 ** 2, 50 * 1024 ** 2)
+
+# Métricas registradas: nombre -> {'tipo', 'ayuda', 'buckets', 'series'}
+# donde series es etiquetas (tupla ordenada) -> valor o estado del histograma
+_metricas = {}
+_lock = threading.Lock()
+
+# Traza de la solicitud en curso (se propaga a los hilos de descarga con contextvars)
+_traza_actual = contextvars.ContextVar('traza_actual', default=None)
+
+def _registrar(nombre, tipo, ayuda, buckets=None):
+    if nombre not in _metricas:
+        _metricas[nombre] = {'tipo': tipo, 'ayuda': ayuda, 'buckets': buckets, 'series': {}}
+    return _metricas[nombre]
+
+def histograma(nombre, ayuda, buckets=BUCKETS_SEGUNDOS):
+    with _lock:
+        _registrar(nombre, 'histogram', ayuda, buckets)
+
+def contador(nombre, ayuda):
+    with _lock:
+        _registrar(nombre, 'counter', ayuda)
+
+def gauge(nombre, ayuda):
+    with _lock:
+        _registrar(nombre, 'gauge', ayuda)
+
+def observar(nombre, valor, **etiquetas):
+    """Añade una observación a un histograma."""
+    clave = tuple(sorted(etiquetas.items()))
+    with _lock:
+        metrica = _metricas[nombre]
+        serie = metrica['series'].get(clave)
+        if serie is None:
+            serie = metrica['series'][clave] = {'buckets': [0] * len(metrica['buckets']), 'suma': 0.0, 'total': 0}
+        for i, limite in enumerate(metrica['buckets']):
+            if valor <= limite:
+                serie['buckets'][i] += 1
+        serie['suma'] += valor
+        serie['total'] += 1
+
+def incrementar(nombre, valor=1, **etiquetas):
+    clave = tuple(sorted(etiquetas.items()))
+    with _lock:
+        series = _metricas[nombre]['series']
+        series[clave] = series.get(clave, 0) + valor
+
+def fijar(nombre, valor, **etiquetas):
+    with _lock:
+        _metricas[nombre]['series'][tuple(sorted(etiquetas.items()))] = valor
+
+def _formatear_etiquetas(clave, extra=()):
+    pares = list(clave) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+def exportar():
+    """Devuelve todas las métricas en el formato de texto de Prometheus."""
+    lineas = []
+    with _lock:
+        for nombre, metrica in sorted(_metricas.items()):
+            lineas.append(f"# HELP {nombre} {metrica['ayuda']}")
+            lineas.append(f"# TYPE {nombre} {metrica['tipo']}")
+            for clave, serie in sorted(metrica['series'].items()):
+                if metrica['tipo'] != 'histogram':
+                    lineas.append(f"{nombre}{_formatear_etiquetas(clave)} {serie}")
+                    continue
+                for limite, cuenta in zip(metrica['buckets'], serie['buckets']):
+                    lineas.append(f"{nombre}_bucket{_formatear_etiquetas(clave, [('le', limite)])} {cuenta}")
+                lineas.append(f"{nombre}_bucket{_formatear_etiquetas(clave, [('le', '+Inf')])} {serie['total']}")
+                lineas.append(f"{nombre}_sum{_formatear_etiquetas(clave)} {serie['suma']}")
+                lineas.append(f"{nombre}_count{_formatear_etiquetas(clave)} {serie['total']}")
+    return "\n".join(lineas) + "\n"
+
+class Traza:
+    """Spans de una solicitud; se vuelcan como una línea JSON al terminar."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.inicio = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def agregar(self, fase, inicio, duracion, atributos):
+        with self._lock:
+            self.spans.append({
+                'fase': fase,
+                'inicio_ms': round((inicio - self.inicio) * 1000, 2),
+                'duracion_ms': round(duracion * 1000, 2),
+                **atributos,
+            })
+
+@contextmanager
+def traza():
+    """Abre una traza para la solicitud actual y la registra en el log al cerrarse."""
+    actual = Traza()
+    token = _traza_actual.set(actual)
+    try:
+        yield actual
+    finally:
+        _traza_actual.reset(token)
+        total = time.perf_counter() - actual.inicio
+        logging.info("Traza informe " + json.dumps({
+            'traza': actual.id,
+            'total_ms': round(total * 1000, 2),
+            'spans': actual.spans,
+        }, ensure_ascii=False))
+
+@contextmanager
+def span(fase, **atributos):
+    """
+    Mide una fase: alimenta el histograma pptx_fase_segundos{fase=...} y,
+    si hay una traza abierta, añade el span con sus atributos.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield atributos  # El bloque puede completar atributos (p. ej. bytes)
+    finally:
+        duracion = time.perf_counter() - inicio
+        observar('pptx_fase_segundos', duracion, fase=fase)
+        actual = _traza_actual.get()
+        if actual is not None:
+            actual.agregar(fase, inicio, duracion, atributos)
+
+def en_contexto(func):
+    """Envuelve func para ejecutarla en otro hilo conservando la traza actual."""
+    contexto = contextvars.copy_context()
+    # Cada ejecución usa su propia copia: un Context no admite entradas concurrentes
+    return lambda *args, **kwargs: contexto.copy().run(func, *args, **kwargs)
+
+histograma('pptx_fase_segundos', "Duración de cada fase de generación del informe")
+histograma('pptx_descarga_segundos', "Duración de cada descarga de imagen")
+histograma('pptx_descarga_bytes', "Tamaño de cada imagen obtenida", BUCKETS_BYTES)
+histograma('pptx_informe_bytes', "Tamaño del .pptx generado", BUCKETS_BYTES)
+contador('pptx_descargas_total', "Imágenes solicitadas por resultado")
+contador('pptx_cache_imagenes_total', "Consultas a la caché de imágenes por resultado")
+contador('pptx_imagenes_bytes_total', "Bytes de los gráficos descargados ('original') y tal como se incrustan")
+contador('pptx_cache_informes_total', "Solicitudes servidas desde la caché de informes, compartidas o generadas")
+contador('pptx_http_total', "Peticiones HTTP y conexiones abiertas o reutilizadas del pool")
+contador('pptx_solicitudes_total', "Solicitudes de informe por código de estado")
+gauge('pptx_trabajos_admitidos', "Informes en ejecución o en cola en el pool")
@@ -0,0 +1,209 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+# Modelo del informe: el JSON se valida y normaliza una sola vez al recibirlo,
+# y los constructores de diapositivas solo leen atributos ya formateados.
+
+# Tipos de medio con diapositivas de cobertura, en el orden del informe
+MEDIOS = ["TV", "Radio", "Prensa", "Medios Digitales"]
+
+# Formatos de fecha admitidos: patrón y posición de (año, mes, día) en sus grupos.
+# Equivalen a '%Y-%m-%d', '%d-%m-%Y', '%Y/%m/%d' y '%d/%m/%Y' sin probar strptime uno a uno.
+FORMATOS_FECHA = [
+    (re.compile(r'(\d{4})([-/])(\d{1,2})\2(\d{1,2})'), (0, 2, 3)),
+    (re.compile(r'(\d{1,2})([-/])(\d{1,2})\2(\d{4})'), (3, 2, 0)),
+]
+FECHAS_CACHE = int(os.environ.get("PPTX_FECHAS_CACHE", "4096"))  # Fechas distintas memorizadas
+
+@lru_cache(maxsize=FECHAS_CACHE)
+def formatear_fecha(fecha_str):
+    """
+    Convierte el formato de fecha YYYY-MM-DD a DD-MM-YY.
+    También acepta DD-MM-YYYY, YYYY/MM/DD y DD/MM/YYYY; si no reconoce
+    la fecha, la devuelve sin cambios.
+    """
+    if not fecha_str or fecha_str == 'N/A':
+        return 'N/A'
+    
+    try:
+        for patron, orden in FORMATOS_FECHA:
+            encontrado = patron.fullmatch(fecha_str)
+            if encontrado:
+                partes = encontrado.groups()
+                # datetime() rechaza fechas imposibles (31-02, mes 13...) como hacía strptime
+                fecha_obj = datetime(int(partes[orden[0]]), int(partes[orden[1]]), int(partes[orden[2]]))
+                # Formatear como DD-MM-YY
+                return f"{fecha_obj.day:02d}-{fecha_obj.month:02d}-{fecha_obj.year % 100:02d}"
+    except ValueError:
+        pass
+    except Exception as e:
+        logging.error(f"Error al formatear fecha '{fecha_str}': {e}")
+    
+    # Si no se pudo parsear, devolver la fecha original
+    return fecha_str
+
+def formatear_moneda(valor):
+    """
+    Añade el símbolo de euro (€) a los valores monetarios.
+    Preserva los puntos como separadores de miles.
+    """
+    if not valor or valor == 'N/A':
+        return 'N/A'
+    
+    try:
+        # Convertir el valor a string si no lo es
+        valor_str = str(valor).strip()
+        
+        # Si ya tiene el símbolo de euro, lo devolvemos tal cual
+        if '€' in valor_str:
+            return valor_str
+        
+        # Añadir el símbolo de euro al final
+        return f"{valor_str} €"
+    except Exception as e:
+        logging.error(f"Error al formatear valor monetario '{valor}': {e}")
+        return f"{valor} €"
+
+def _simple(valor, campo):
+    """Rechaza objetos y listas donde se espera un valor escalar."""
+    if isinstance(valor, (dict, list)):
+        raise ValueError(f"El campo '{campo}' debe ser un valor simple, no {type(valor).__name__}")
+    return valor
+
+def _texto(valor, campo):
+    """Valor escalar como texto; 'N/A' si falta."""
+    return 'N/A' if valor is None else str(_simple(valor, campo))
+
+# Números con el formato del pipeline: '1.234.567', '12,5', '1.234,56 €'
+_NUMERO = re.compile(r'-?\d{1,3}(?:\.\d{3})+(?:,\d+)?|-?\d+(?:,\d+)?')
+
+def _numero(valor, campo):
+    """Valor numérico de una serie: número JSON o texto con separador de miles '.' y decimal ','."""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str):
+        texto = valor.replace('€', '').strip()
+        if _NUMERO.fullmatch(texto):
+            return float(texto.replace('.', '').replace(',', '.'))
+    raise ValueError(f"El campo '{campo}' debe ser numérico")
+
+def _lista(valor, campo):
+    if valor is None:
+        return []
+    if not isinstance(valor, list):
+        raise ValueError(f"El campo '{campo}' debe ser una lista")
+    return valor
+
+@dataclass(slots=True)
+class Noticia:
+    fecha: str          # Ya en formato DD-MM-AA
+    titulo: str
+    titular: str
+    enlace: str | None  # url o, si no hay, link
+
+    @classmethod
+    def desde_json(cls, datos, campo='noticia'):
+        if not isinstance(datos, dict):
+            raise ValueError(f"Cada elemento de '{campo}' debe ser un objeto")
+        enlace = datos.get('url') or datos.get('link')
+        return cls(
+            fecha=formatear_fecha(_texto(datos.get('fecha'), f"{campo}.fecha")),
+            titulo=_texto(datos.get('titulo'), f"{campo}.titulo"),
+            titular=_texto(datos.get('titular'), f"{campo}.titular"),
+            enlace=_texto(enlace, f"{campo}.url") if enlace else None,
+        )
+
+@dataclass(slots=True)
+class CoberturaMedio:
+    cantidad_noticias: str
+    total_audiencia: str
+    total_vpe: str      # Ya con el símbolo €
+    total_vc: str
+    noticias: list      # Noticia
+
+    @classmethod
+    def desde_json(cls, medio, datos):
+        """Valida el bloque {medio}_raw. Devuelve None si viene vacío (el medio no tiene datos)."""
+        campo = f"{medio}_raw"
+        if not datos:
+            return None
+        if not isinstance(datos, dict):
+            raise ValueError(f"El campo '{campo}' debe ser un objeto")
+        return cls(
+            cantidad_noticias=_texto(datos.get('cantidad_noticias'), f"{campo}.cantidad_noticias"),
+            total_audiencia=_texto(datos.get('total_audiencia'), f"{campo}.total_audiencia"),
+            total_vpe=formatear_moneda(_simple(datos.get('total_vpe'), f"{campo}.total_vpe")),
+            total_vc=formatear_moneda(_simple(datos.get('total_vc'), f"{campo}.total_vc")),
+            noticias=[
+                Noticia.desde_json(noticia, f"{campo}.noticias")
+                for noticia in _lista(datos.get('noticias'), f"{campo}.noticias")
+            ],
+        )
+
+@dataclass(slots=True)
+class SerieGrafico:
+    categorias: list    # Medios o nombres del top 10, en el orden del payload
+    valores: list       # Números, uno por categoría
+
+    @classmethod
+    def desde_json(cls, nombre, datos):
+        """Valida una serie {categoria: valor} del campo 'series'."""
+        campo = f"series.{nombre}"
+        if not isinstance(datos, dict) or not datos:
+            raise ValueError(f"El campo '{campo}' debe ser un objeto con al menos un valor")
+        return cls(
+            categorias=list(datos),
+            valores=[_numero(valor, f"{campo}.{categoria}") for categoria, valor in datos.items()],
+        )
+
+@dataclass(slots=True)
+class Informe:
+    fecha_inicial: str
+    fecha_final: str
+    total_global_vpe: str  # Ya con el símbolo €
+    urls: list             # URLs de los gráficos
+    coberturas: dict       # medio -> CoberturaMedio (solo los medios con datos)
+    series: dict           # gráfico (p. ej. 'vpe_barra') -> SerieGrafico, para gráficos nativos
+
+    @classmethod
+    def desde_json(cls, data):
+        """
+        Valida el payload (el objeto o una lista cuyo primer elemento es el
+        objeto) y lo normaliza. Lanza ValueError si está mal formado.
+        """
+        if not isinstance(data, (list, dict)):
+            logging.error("Input data must be a list or dict.")
+            raise ValueError("Input data must be a list or dict.")
+        
+        datos = data[0] if isinstance(data, list) and data else data
+        if not isinstance(datos, dict):
+            logging.error("No se pudo extraer el objeto de datos principal.")
+            raise ValueError("No se pudo extraer el objeto de datos principal.")
+        
+        urls = _lista(datos.get('urls'), 'urls')
+        if not all(isinstance(url, str) for url in urls):
+            raise ValueError("El campo 'urls' debe ser una lista de cadenas")
+        
+        series = datos.get('series') or {}
+        if not isinstance(series, dict):
+            raise ValueError("El campo 'series' debe ser un objeto")
+        series = {nombre: SerieGrafico.desde_json(nombre, serie) for nombre, serie in series.items()}
+        
+        coberturas = {}
+        for medio in MEDIOS:
+            cobertura = CoberturaMedio.desde_json(medio, datos.get(f"{medio}_raw"))
+            if cobertura is not None:
+                coberturas[medio] = cobertura
+        
+        return cls(
+            fecha_inicial=_texto(datos.get('fechaInicial'), 'fechaInicial'),
+            fecha_final=_texto(datos.get('fechaFinal'), 'fechaFinal'),
+            total_global_vpe=formatear_moneda(_simple(datos.get('totalGlobalVPE'), 'totalGlobalVPE')),
+            urls=urls,
+            coberturas=coberturas,
+            series=series,
+        )
@@ -0,0 +1,96 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# Optimización de los gráficos antes de incrustarlos (ajustable por variables de entorno)
+# Resolución con la que se reescala cada gráfico al tamaño de su marco; 0 (por defecto) desactiva la optimización
+IMAGENES_DPI = float(os.environ.get("PPTX_IMAGENES_DPI", "0"))
+# Colores distintos hasta los que un gráfico se considera plano y se pasa a paleta (como mucho 256: sin pérdidas)
+IMAGENES_COLORES_PLANOS = min(256, int(os.environ.get("PPTX_IMAGENES_COLORES_PLANOS", "256")))
+# Calidad JPEG para imágenes fotográficas sin transparencia; 0 las deja en PNG (sin pérdidas)
+IMAGENES_JPEG_CALIDAD = int(os.environ.get("PPTX_IMAGENES_JPEG_CALIDAD", "0"))
+IMAGENES_CACHE_BYTES = int(float(os.environ.get("PPTX_IMAGENES_CACHE_MB", "32")) * 1024 * 1024)
+
+EMU_POR_PULGADA = 914400
+
+# Resultados ya calculados: (hash del original, ancho, alto) -> bytes optimizados, en orden de uso (LRU)
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+def tamano_objetivo(ancho_emu, alto_emu, dpi=None):
+    """Píxeles que necesita un marco de ancho_emu x alto_emu a la resolución indicada."""
+    dpi = IMAGENES_DPI if dpi is None else dpi
+    return (max(1, round(ancho_emu / EMU_POR_PULGADA * dpi)),
+            max(1, round(alto_emu / EMU_POR_PULGADA * dpi)))
+
+def _guardar_cache(clave, contenido):
+    global _cache_bytes
+    with _lock:
+        if clave in _cache or len(contenido) > IMAGENES_CACHE_BYTES:
+            return
+        _cache[clave] = contenido
+        _cache_bytes += len(contenido)
+        while _cache_bytes > IMAGENES_CACHE_BYTES:
+            _, expulsada = _cache.popitem(last=False)
+            _cache_bytes -= len(expulsada)
+
+def _recomprimir(contenido, ancho, alto):
+    """Reescala a como mucho ancho x alto y elige la codificación más pequeña."""
+    with Image.open(io.BytesIO(contenido)) as original:
+        original.load()
+        img = original
+        if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode == 'PA' else 'RGB')
+
+        # Los colores se cuentan en el original: el reescalado LANCZOS añade tonos intermedios
+        colores = img.getcolors(IMAGENES_COLORES_PLANOS) if img.mode == 'RGB' else None
+        if colores is not None:
+            # Gráfico de colores planos: la paleta son exactamente sus colores, así que no se
+            # pierde ninguno, y una imagen con paleta se reescala sin mezclarlos
+            paleta = Image.new('P', (1, 1))
+            paleta.putpalette([canal for _, color in colores for canal in color])
+            img = img.quantize(palette=paleta, dither=Image.Dither.NONE)
+        if img.width > ancho or img.height > alto:
+            img = img.copy() if img is original else img
+            img.thumbnail((ancho, alto), Image.LANCZOS)
+
+        salida = io.BytesIO()
+        img.save(salida, 'PNG', optimize=True)
+        candidatos = [salida.getvalue()]
+        if colores is None and IMAGENES_JPEG_CALIDAD > 0 and img.mode in ('RGB', 'L'):
+            salida = io.BytesIO()
+            img.save(salida, 'JPEG', quality=IMAGENES_JPEG_CALIDAD, optimize=True)
+            candidatos.append(salida.getvalue())
+    return min(candidatos, key=len)
+
+def optimizar_imagen(contenido, ancho_emu, alto_emu):
+    """
+    Devuelve la imagen preparada para un marco de ancho_emu x alto_emu:
+    reescalada a PPTX_IMAGENES_DPI y recomprimida, o el original si así no
+    se gana nada o no se puede decodificar. El resultado se cachea por el
+    hash del contenido y el tamaño de destino.
+    """
+    if IMAGENES_DPI <= 0:
+        return contenido
+    ancho, alto = tamano_objetivo(ancho_emu, alto_emu)
+    clave = (hashlib.sha256(contenido).digest(), ancho, alto)
+    with _lock:
+        optimizada = _cache.get(clave)
+        if optimizada is not None:
+            _cache.move_to_end(clave)
+            return optimizada
+
+    try:
+        optimizada = _recomprimir(contenido, ancho, alto)
+    except Exception as e:
+        logging.warning(f"No se pudo optimizar la imagen, se incrusta la original: {e}")
+        return contenido
+    if len(optimizada) >= len(contenido):
+        optimizada = contenido
+    _guardar_cache(clave, optimizada)
+    return optimizada
@@ -2,14 +2,31 @@ from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import MSO_ANCHOR, MSO_AUTO_SIZE, PP_ALIGN
 from pptx.dml.color import RGBColor
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE, XL_LABEL_POSITION, XL_LEGEND_POSITION
 from pptx.enum.shapes import MSO_SHAPE
-from PIL import Image
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.shapes.autoshape import Shape
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.text.text import _Paragraph
+from lxml import etree
+from xml.sax.saxutils import escape
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import copy
+import io
 import os
 import logging
-from app.utils import download_image
+import re
 import tempfile
-import requests
-from datetime import datetime
+import threading
+import time
+from app.utils import dimensiones_imagen, prefetch_imagenes
+from app.fragmentos import extraer_fragmento, insertar_fragmento
+from app.logo import obtener_logo
+from app.optimizacion_imagenes import optimizar_imagen
+from app.modelo import MEDIOS, CoberturaMedio, Informe
+from app import fragmentos, metricas
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -32,155 +49,307 @@ FUENTES = {
     'cuerpo': 'Segoe UI'
 }
 
+# Plazo total (segundos) para descargar todos los gráficos de un informe
+GRAFICOS_DEADLINE = float(os.environ.get("PPTX_GRAFICOS_DEADLINE", "30"))
+# Segundos del plazo de un informe que se reservan para montar y guardar tras las descargas
+PLAZO_RESERVA = float(os.environ.get("PPTX_PLAZO_RESERVA", "2"))
+
+# Tamaño a partir del cual la presentación generada se vuelca a un archivo temporal
+SPOOL_MAX = int(float(os.environ.get("PPTX_SPOOL_MAX_MB", "32")) * 1024 * 1024)
+
+# Versión del diseño de las diapositivas: cambiarla invalida los informes cacheados (app/cache_informes.py)
+VERSION_PLANTILLA = "1"
+
+# Layouts de la plantilla corporativa y alto de su barra de título
+LAYOUT_PORTADA = 0
+LAYOUT_CONTENIDO = 6
+ALTO_BARRA = {
+    LAYOUT_PORTADA: Inches(1.5),
+    LAYOUT_CONTENIDO: Inches(1),
+}
+
+# Cajas de noticias (top, alto) en la diapositiva de cobertura y en las de continuación
+CAJA_NOTICIAS_PRIMERA = (Inches(3.2), Inches(3))
+CAJA_NOTICIAS_CONTINUACION = (Inches(1.5), Inches(5))
+
+# Paginación de noticias: estimación del texto en puntos (márgenes internos de 0.1" x 0.05")
+INTERLINEADO = 1.2
+ANCHO_CARACTER = 0.55  # Ancho medio de un carácter de Segoe UI respecto al tamaño de fuente
+ANCHO_TEXTO_NOTICIAS = Inches(8 - 2 * 0.1).pt
+ALTO_ENCABEZADO_NOTICIAS = 16 * INTERLINEADO + 10
+ALTO_NOTICIAS_PRIMERA = CAJA_NOTICIAS_PRIMERA[1].pt - Inches(2 * 0.05).pt - ALTO_ENCABEZADO_NOTICIAS
+ALTO_NOTICIAS_CONTINUACION = CAJA_NOTICIAS_CONTINUACION[1].pt - Inches(2 * 0.05).pt - ALTO_ENCABEZADO_NOTICIAS
+
+# Presentación base ya construida y logo con el que se generó
+_plantilla = {'base': None, 'logo': None}
+_plantilla_lock = threading.Lock()
+
 def aplicar_estilo_slide(slide):
-    """Aplica el estilo base a una diapositiva."""
+    """Aplica el estilo base a una diapositiva o layout."""
     background = slide.background
     fill = background.fill
     fill.solid()
     fill.fore_color.rgb = COLORES['fondo_claro']
 
+def aplicar_formato(p, fuente=None, tamano=None, color=None, negrita=None, cursiva=None,
+                    alineacion=None, antes=None, despues=None, nivel=None, en_run=False):
+    """
+    Formatea un párrafo propiedad a propiedad con los setters de python-pptx.
+    Solo se usa para compilar ESTILOS; con en_run=True la fuente va en el
+    primer run en lugar de en las propiedades por defecto del párrafo.
+    """
+    font = p.runs[0].font if en_run else p.font
+    if fuente:
+        font.name = fuente
+    if tamano:
+        font.size = Pt(tamano)
+    if color:
+        font.color.rgb = color
+    if negrita is not None:
+        font.bold = negrita
+    if cursiva is not None:
+        font.italic = cursiva
+    if alineacion is not None:
+        p.alignment = alineacion
+    if nivel:
+        p.level = nivel
+    if antes is not None:
+        p.space_before = Pt(antes)
+    if despues is not None:
+        p.space_after = Pt(despues)
+
+def compilar_estilo(**formato):
+    """Devuelve los elementos (<a:pPr>, <a:rPr>) que dejan los setters, para copiarlos tal cual."""
+    p = _Paragraph(parse_xml(f'<a:p {nsdecls("a")}><a:r><a:t/></a:r></a:p>'), None)
+    aplicar_formato(p, **formato)
+    return p._p.pPr, p._p.r_lst[0].rPr
+
+# Estilos de texto precompilados: cada párrafo copia su XML de una vez en lugar
+# de recorrer y modificar el árbol con un setter por propiedad
+FORMATOS_TEXTO = {
+    'titulo': dict(fuente=FUENTES['titulo'], tamano=28, color=COLORES['blanco'], alineacion=PP_ALIGN.CENTER),
+    'subtitulo_continuacion': dict(fuente=FUENTES['subtitulo'], tamano=16, color=COLORES['blanco'],
+                                   alineacion=PP_ALIGN.CENTER),
+    'subtitulo_portada': dict(fuente=FUENTES['subtitulo'], tamano=24, color=COLORES['secundario'],
+                              alineacion=PP_ALIGN.CENTER),
+    'subtitulo': dict(fuente=FUENTES['subtitulo'], tamano=20, color=COLORES['secundario'], alineacion=PP_ALIGN.CENTER),
+    'cuerpo': dict(fuente=FUENTES['cuerpo'], tamano=14, color=COLORES['texto_oscuro']),
+    'metodologia': dict(fuente=FUENTES['cuerpo'], tamano=18, color=COLORES['texto_oscuro']),
+    'metodologia_detalle': dict(fuente=FUENTES['cuerpo'], tamano=18, color=COLORES['texto_oscuro'], nivel=1),
+    'encabezado_noticias': dict(fuente=FUENTES['subtitulo'], tamano=16, color=COLORES['secundario'], despues=10),
+    'titulo_noticia': dict(fuente=FUENTES['cuerpo'], tamano=12, color=COLORES['texto_oscuro'], negrita=True,
+                            antes=5, despues=2),
+    'titular_noticia': dict(fuente=FUENTES['cuerpo'], tamano=11, color=COLORES['secundario'], cursiva=True,
+                           despues=8, en_run=True),
+    'resumen_vpe': dict(fuente=FUENTES['subtitulo'], tamano=20, color=COLORES['secundario'],
+                        alineacion=PP_ALIGN.CENTER, despues=20),
+    'total_vpe': dict(fuente=FUENTES['cuerpo'], tamano=28, color=COLORES['principal'], negrita=True,
+                      alineacion=PP_ALIGN.CENTER),
+    'aviso': dict(color=COLORES['acento'], tamano=16, negrita=True, alineacion=PP_ALIGN.CENTER),
+    'pie': dict(tamano=9, fuente=FUENTES['cuerpo'], color=COLORES['texto_oscuro'], alineacion=PP_ALIGN.CENTER),
+}
+ESTILOS = {nombre: compilar_estilo(**formato) for nombre, formato in FORMATOS_TEXTO.items()}
+
+def escribir_parrafo(tf, texto, estilo, nuevo=True):
+    """
+    Escribe `texto` en un párrafo con uno de ESTILOS. Con nuevo=False sustituye
+    al primer párrafo del marco (como tf.text). Devuelve el elemento <a:p>.
+    """
+    txBody = tf._txBody
+    p = txBody.add_p()
+    if not nuevo:
+        txBody.replace(txBody.p_lst[0], p)
+    ppr, rpr = ESTILOS[estilo]
+    if ppr is not None:
+        p.insert(0, copy.deepcopy(ppr))
+    p.append_text(texto)
+    if rpr is not None:
+        for r in p.r_lst:
+            r.insert(0, copy.deepcopy(rpr))
+    return p
+
+# Plantillas XML de los párrafos de la caja de noticias (ver escribir_noticias)
+_DECLARACIONES_NS = re.compile(r' xmlns:\w+="[^"]*"')
+_SALTOS = re.compile("\n|\v")
+_CONTROL = re.compile(r"[\x00-\x08\x0B-\x1F]")
+
+def _xml_plantilla(elemento):
+    """Serializa un elemento sin sus declaraciones de espacios de nombres, para incrustarlo en texto."""
+    if elemento is None:
+        return ''
+    return _DECLARACIONES_NS.sub('', etree.tostring(elemento, encoding='unicode'))
+
+def compilar_plantilla_parrafo(estilo, enlazado=False):
+    """
+    Devuelve (XML del pPr, XML del rPr de cada run) de uno de ESTILOS. Con
+    enlazado=True el rPr lleva el hlinkClick del enlace de la noticia, con
+    '{rId}' en lugar de la relación.
+    """
+    ppr, rpr = ESTILOS[estilo]
+    if enlazado:
+        # Dentro de un run con el prefijo r: declarado, para que el atributo se serialice como r:id
+        r = parse_xml(f'<a:r {nsdecls("a", "r")}><a:t/></a:r>')
+        if rpr is not None:
+            r.insert(0, copy.deepcopy(rpr))
+        rpr = r.get_or_add_rPr()
+        rpr.add_hlinkClick('{rId}')
+    return _xml_plantilla(ppr), _xml_plantilla(rpr)
+
+PLANTILLAS_NOTICIAS = {
+    'encabezado': compilar_plantilla_parrafo('encabezado_noticias'),
+    'titulo': compilar_plantilla_parrafo('titulo_noticia'),
+    'titular': compilar_plantilla_parrafo('titular_noticia'),
+    'titular_enlazado': compilar_plantilla_parrafo('titular_noticia', enlazado=True),
+}
+
+def parrafo_xml(texto, plantilla, rId=None):
+    """XML de un párrafo idéntico al que deja escribir_parrafo, con el hipervínculo `rId` en cada run si se indica."""
+    ppr, rpr = plantilla
+    if rId is not None:
+        rpr = rpr.replace('{rId}', rId)
+    partes = ['<a:p>', ppr]
+    # Igual que append_text: cada salto de línea es un <a:br/> y los controles se escapan como _xHHHH_
+    for i, linea in enumerate(_SALTOS.split(texto)):
+        if i:
+            partes.append('<a:br/>')
+        if linea:
+            linea = _CONTROL.sub(lambda m: "_x%04X_" % ord(m.group()), linea)
+            partes.append(f'<a:r>{rpr}<a:t>{escape(linea)}</a:t></a:r>')
+    partes.append('</a:p>')
+    return ''.join(partes)
+
+def escribir_noticias(tf, noticias):
+    """
+    Escribe el encabezado y las noticias de una caja como un único fragmento
+    XML a partir de PLANTILLAS_NOTICIAS: el mismo resultado que escribir_parrafo
+    noticia a noticia (más un hlinkClick por run en los titulares con enlace),
+    sin crear un proxy de python-pptx por párrafo. Sustituye los párrafos que
+    tuviera el marco.
+    """
+    # El encabezado ocupa el párrafo inicial para no dejar una línea vacía que no se cuenta
+    partes = [parrafo_xml("📰 Noticias Destacadas", PLANTILLAS_NOTICIAS['encabezado'])]
+    for noticia in noticias:
+        partes.append(parrafo_xml(linea_titulo(noticia), PLANTILLAS_NOTICIAS['titulo']))
+        
+        # Párrafo con hipervínculo al titular
+        if noticia.enlace:
+            rId = tf.part.relate_to(noticia.enlace, RT.HYPERLINK, is_external=True)
+            partes.append(parrafo_xml(linea_titular(noticia), PLANTILLAS_NOTICIAS['titular_enlazado'], rId))
+        else:
+            partes.append(parrafo_xml(linea_titular(noticia), PLANTILLAS_NOTICIAS['titular']))
+    
+    txBody = tf._txBody
+    for p in txBody.p_lst:
+        txBody.remove(p)
+    txBody.extend(parse_xml(f'<a:txBody {nsdecls("a", "r")}>{"".join(partes)}</a:txBody>'))
+
 def add_footer(slide, text_content):
     """Añade un pie de página mejorado."""
     footer = slide.shapes.add_textbox(Inches(0.5), Inches(6.9), Inches(9), Inches(0.3))
-    tf = footer.text_frame
-    tf.text = text_content
+    escribir_parrafo(footer.text_frame, text_content, 'pie', nuevo=False)
+
+def agregar_barra_titulo(layout, alto):
+    """Añade la barra de título corporativa a un layout."""
+    shapes = layout.shapes
+    sp = shapes._spTree.add_autoshape(shapes._next_shape_id, "Barra de título", "rect", 0, 0, Inches(10), alto)
+    barra = Shape(sp, shapes)
+    barra.fill.solid()
+    barra.fill.fore_color.rgb = COLORES['principal']
+    barra.line.fill.background()
+
+def agregar_logo(layout, logo):
+    """Agrega el logo corporativo en la esquina superior izquierda de un layout."""
+    contenido, (ancho_px, alto_px) = logo
+    
+    # Posición en esquina superior izquierda, tamaño fijo manteniendo proporción
+    left = Inches(0.3)
+    top = Inches(0.2)
+    width = Inches(1.2)
+    height = int(width * alto_px / ancho_px)
+    
+    image_part = layout.part.package.get_or_add_image_part(io.BytesIO(contenido))
+    rId = layout.part.relate_to(image_part, RT.IMAGE)
+    layout.shapes._spTree.add_pic(layout.shapes._next_shape_id, "Logo", "Logo MMI", rId, left, top, width, height)
+
+def agregar_textbox_layout(layout, left, top, width, height, texto, fuente, tamano, color):
+    """Añade a un layout un cuadro de texto fijo y centrado."""
+    shapes = layout.shapes
+    id_ = shapes._next_shape_id
+    sp = shapes._spTree.add_textbox(id_, f"TextBox {id_ - 1}", left, top, width, height)
+    tf = Shape(sp, shapes).text_frame
+    tf.text = texto
     p = tf.paragraphs[0]
-    p.font.size = Pt(9)
-    p.font.name = FUENTES['cuerpo']
-    p.font.color.rgb = COLORES['texto_oscuro']
+    p.font.name = fuente
+    p.font.size = tamano
+    p.font.color.rgb = color
     p.alignment = PP_ALIGN.CENTER
 
-def agregar_logo(slide):
-    """Agrega el logo corporativo en la esquina superior izquierda de cada diapositiva."""
-    # URL directa al logo de MMI
-    logo_url = "https://mmi-e.com/wp-content/uploads/2023/03/LogoMMI_1024x1024.png"
+def construir_plantilla(logo):
+    """
+    Genera la presentación base: los layouts de portada y contenido llevan
+    el fondo, la barra de título y el logo, y la portada además su título y
+    pie fijos, de modo que cada diapositiva solo añade su propio contenido.
+    """
+    pr = Presentation()
+    for indice, alto_barra in ALTO_BARRA.items():
+        layout = pr.slide_layouts[indice]
+        for placeholder in list(layout.placeholders):
+            placeholder._element.getparent().remove(placeholder._element)
+        aplicar_estilo_slide(layout)
+        agregar_barra_titulo(layout, alto_barra)
+        if logo:
+            agregar_logo(layout, logo)
     
-    try:
-        # Ruta temporal para almacenar el logo descargado
-        temp_dir = tempfile.gettempdir()
-        logo_path = os.path.join(temp_dir, "logo_mmi.png")
-        
-        # Intentar descargar el logo si no existe
-        if not os.path.exists(logo_path) or os.path.getsize(logo_path) == 0:
-            logging.info(f"Descargando logo desde {logo_url}")
-            response = requests.get(logo_url, stream=True, timeout=15)
-            if response.status_code == 200:
-                with open(logo_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                logging.info(f"Logo descargado correctamente a {logo_path}")
-            else:
-                logging.error(f"Error al descargar logo: {response.status_code}")
-                # Intentar con URL alternativa
-                alt_logo_url = "https://mmi-e.com/wp-content/uploads/2020/09/logo-mmi.png"
-                logging.info(f"Intentando con URL alternativa: {alt_logo_url}")
-                response = requests.get(alt_logo_url, stream=True, timeout=15)
-                if response.status_code == 200:
-                    with open(logo_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    logging.info(f"Logo alternativo descargado correctamente")
-                else:
-                    logging.error(f"Error al descargar logo alternativo: {response.status_code}")
-                    return
-        
-        # Verificar que el archivo existe y tiene contenido
-        if os.path.exists(logo_path) and os.path.getsize(logo_path) > 0:
-            # Posición en esquina superior izquierda
-            left = Inches(0.3)  # Cambiado de derecha a izquierda
-            top = Inches(0.2)
-            width = Inches(1.2)
-            
-            # Añadir logo con tamaño fijo
-            logo = slide.shapes.add_picture(logo_path, left, top, width=width)
-            logging.info(f"Logo añadido correctamente a la diapositiva en la esquina izquierda")
-        else:
-            logging.error(f"El archivo del logo no existe o está vacío: {logo_path}")
-            
-    except Exception as e:
-        logging.error(f"Error al añadir logo: {e}")
+    # Contenido fijo de la portada (título ajustado para no solaparse con el logo)
+    portada = pr.slide_layouts[LAYOUT_PORTADA]
+    agregar_textbox_layout(portada, Inches(1.8), Inches(2.5), Inches(6.4), Inches(1),
+                           "Informe de Medios", FUENTES['titulo'], Pt(44), COLORES['principal'])
+    agregar_textbox_layout(portada, Inches(0.5), Inches(6.9), Inches(9), Inches(0.3),
+                           "Informe de Medios", FUENTES['cuerpo'], Pt(9), COLORES['texto_oscuro'])
+    
+    salida = io.BytesIO()
+    pr.save(salida)
+    return salida.getvalue()
 
-def formatear_fecha(fecha_str):
+def obtener_plantilla():
     """
-    Convierte el formato de fecha YYYY-MM-DD a DD-MM-YY
+    Devuelve la presentación base, ya analizada y lista para clonar. Se
+    construye una vez por proceso y solo se rehace si cambia el logo.
     """
-    try:
-        if not fecha_str or fecha_str == 'N/A':
-            return 'N/A'
-            
-        # Intentar diferentes formatos de fecha posibles
-        formatos = ['%Y-%m-%d', '%d-%m-%Y', '%Y/%m/%d', '%d/%m/%Y']
-        fecha_obj = None
-        
-        for formato in formatos:
-            try:
-                fecha_obj = datetime.strptime(fecha_str, formato)
-                break
-            except ValueError:
-                continue
-                
-        if not fecha_obj:
-            # Si no se pudo parsear, devolver la fecha original
-            return fecha_str
-            
-        # Formatear como DD-MM-YY
-        return fecha_obj.strftime('%d-%m-%y')
-    except Exception as e:
-        logging.error(f"Error al formatear fecha '{fecha_str}': {e}")
-        return fecha_str
+    # El logo se mantiene en memoria para todo el proceso (ver app/logo.py)
+    logo = obtener_logo()
+    contenido_logo = logo[0] if logo else None
+    with _plantilla_lock:
+        if _plantilla['base'] is None or _plantilla['logo'] is not contenido_logo:
+            if not logo:
+                logging.warning("Logo aún no disponible, la plantilla se genera sin él")
+            # Se vuelve a leer para que la base no arrastre objetos proxy de
+            # python-pptx cacheados durante la construcción y pueda clonarse
+            _plantilla['base'] = Presentation(io.BytesIO(construir_plantilla(logo)))
+            _plantilla['logo'] = contenido_logo
+        return _plantilla['base']
 
-def formatear_moneda(valor):
+def nueva_presentacion(degradados=None):
     """
-    Añade el símbolo de euro (€) a los valores monetarios.
-    Preserva los puntos como separadores de miles.
+    Clona la presentación base: mucho más barato que Presentation() o volver
+    a leer el .pptx. Si la base clonada no lleva logo se anota en
+    `degradados` como {'url': None, 'motivo': 'logo'}.
     """
-    if not valor or valor == 'N/A':
-        return 'N/A'
-    
-    try:
-        # Convertir el valor a string si no lo es
-        valor_str = str(valor).strip()
-        
-        # Si ya tiene el símbolo de euro, lo devolvemos tal cual
-        if '€' in valor_str:
-            return valor_str
-        
-        # Añadir el símbolo de euro al final
-        return f"{valor_str} €"
-    except Exception as e:
-        logging.error(f"Error al formatear valor monetario '{valor}': {e}")
-        return f"{valor} €"
+    obtener_plantilla()
+    # La base nunca se modifica, pero lxml no garantiza lecturas concurrentes seguras.
+    # Base y logo se leen juntos: otro hilo puede rehacer la base al cambiar el logo
+    with _plantilla_lock:
+        if _plantilla['logo'] is None and degradados is not None:
+            degradados.append({'url': None, 'motivo': 'logo'})
+        return copy.deepcopy(_plantilla['base'])
 
-def crear_portada(pr, datos):
-    slide = pr.slides.add_slide(pr.slide_layouts[5])  # Usar layout en blanco
-    aplicar_estilo_slide(slide)
-    
-    # Barra superior decorativa
-    top_rect = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        0,
-        0,
-        Inches(10),
-        Inches(1.5)
-    )
-    top_rect.fill.solid()
-    top_rect.fill.fore_color.rgb = COLORES['principal']
-    top_rect.line.fill.background()
-    
-    # Título principal centrado horizontalmente, ajustado para no solaparse con el logo
-    title = slide.shapes.add_textbox(
-        Inches(1.8),  # Mover hacia la derecha para evitar solapamiento con el logo
-        Inches(2.5),
-        Inches(6.4),  # Reducir ancho para centrar mejor
-        Inches(1)
-    )
-    tf = title.text_frame
-    tf.text = "Informe de Medios"
-    p = tf.paragraphs[0]
-    p.font.name = FUENTES['titulo']
-    p.font.size = Pt(44)
-    p.font.color.rgb = COLORES['principal']
-    p.alignment = PP_ALIGN.CENTER
+def nueva_diapositiva(pr, layout=LAYOUT_CONTENIDO):
+    """Añade una diapositiva que hereda el fondo, la barra de título y el logo de su layout."""
+    return pr.slides.add_slide(pr.slide_layouts[layout])
+
+def crear_portada(pr, informe):
+    # El título y el pie de página son fijos y vienen en el layout de portada
+    slide = nueva_diapositiva(pr, LAYOUT_PORTADA)
     
     # Subtítulo con período
     subtitle = slide.shapes.add_textbox(
@@ -190,32 +359,10 @@ def crear_portada(pr, datos):
         Inches(0.75)
     )
     tf = subtitle.text_frame
-    tf.text = f"Período: {datos.get('fechaInicial', 'N/A')} - {datos.get('fechaFinal', 'N/A')}"
-    p = tf.paragraphs[0]
-    p.font.name = FUENTES['subtitulo']
-    p.font.size = Pt(24)
-    p.font.color.rgb = COLORES['secundario']
-    p.alignment = PP_ALIGN.CENTER
-    
-    # Añadir logo - asegurar que se añada después de crear todos los elementos
-    agregar_logo(slide)
-    add_footer(slide, "Informe de Medios")
+    escribir_parrafo(tf, f"Período: {informe.fecha_inicial} - {informe.fecha_final}", 'subtitulo_portada', nuevo=False)
 
 def crear_metodologia(pr):
-    slide = pr.slides.add_slide(pr.slide_layouts[5])  # Usar layout en blanco
-    aplicar_estilo_slide(slide)
-    
-    # Barra de título horizontal
-    title_box = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        0,
-        0,
-        Inches(10),
-        Inches(1)
-    )
-    title_box.fill.solid()
-    title_box.fill.fore_color.rgb = COLORES['principal']
-    title_box.line.fill.background()
+    slide = nueva_diapositiva(pr)
     
     # Título centrado horizontalmente
     title = slide.shapes.add_textbox(
@@ -225,12 +372,7 @@ def crear_metodologia(pr):
         Inches(0.6)
     )
     tf = title.text_frame
-    tf.text = "Metodología"
-    p = tf.paragraphs[0]
-    p.font.name = FUENTES['titulo']
-    p.font.size = Pt(28)
-    p.font.color.rgb = COLORES['blanco']
-    p.alignment = PP_ALIGN.CENTER
+    escribir_parrafo(tf, "Metodología", 'titulo', nuevo=False)
     
     # Contenido en caja con estilo
     content_box = slide.shapes.add_shape(
@@ -259,38 +401,11 @@ def crear_metodologia(pr):
     ]
     
     for item in items:
-        p = tf.add_paragraph()
-        p.text = item
-        p.font.name = FUENTES['cuerpo']
-        p.font.size = Pt(18)
-        p.font.color.rgb = COLORES['texto_oscuro']
-        if item.startswith("   -"):
-            p.level = 1
-    
-    # Añadir logo
-    agregar_logo(slide)
+        escribir_parrafo(tf, item, 'metodologia_detalle' if item.startswith("   -") else 'metodologia')
+    
     add_footer(slide, "Metodología - Informe de Medios")
 
-def crear_datos_cobertura(pr, datos, tipo_medio):
-    slide = pr.slides.add_slide(pr.slide_layouts[5])
-    aplicar_estilo_slide(slide)
-    
-    medio_data = datos.get(f"{tipo_medio}_raw", {})
-    if not medio_data:
-        return
-    
-    # Barra de título horizontal
-    title_box = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        0,
-        0,
-        Inches(10),
-        Inches(1)
-    )
-    title_box.fill.solid()
-    title_box.fill.fore_color.rgb = COLORES['principal']
-    title_box.line.fill.background()
-    
+def agregar_titulo_cobertura(slide, tipo_medio, continuacion=False):
     # Título centrado horizontalmente, ajustado para no solaparse con el logo
     title = slide.shapes.add_textbox(
         Inches(1.8),  # Ajustar para dejar espacio al logo
@@ -299,12 +414,78 @@ def crear_datos_cobertura(pr, datos, tipo_medio):
         Inches(0.6)
     )
     tf = title.text_frame
-    tf.text = f"Datos de Cobertura - {tipo_medio}"
-    p = tf.paragraphs[0]
-    p.font.name = FUENTES['titulo']
-    p.font.size = Pt(28)
-    p.font.color.rgb = COLORES['blanco']
-    p.alignment = PP_ALIGN.CENTER
+    escribir_parrafo(tf, f"Datos de Cobertura - {tipo_medio}", 'titulo', nuevo=False)
+    
+    if continuacion:
+        # Subtítulo (Continuación) debajo del título principal
+        subtitle = slide.shapes.add_textbox(
+            Inches(1.8),
+            Inches(0.6),  # Justo debajo del título
+            Inches(6.4),
+            Inches(0.4)
+        )
+        tf = subtitle.text_frame
+        escribir_parrafo(tf, "(Continuación)", 'subtitulo_continuacion', nuevo=False)
+
+def lineas_texto(texto, tamano):
+    """Líneas que ocupa `texto` en la caja de noticias con una fuente de `tamano` puntos (estimación)."""
+    por_linea = max(1, int(ANCHO_TEXTO_NOTICIAS / (tamano * ANCHO_CARACTER)))
+    return max(1, -(-len(texto) // por_linea))
+
+def linea_titulo(noticia):
+    return f"📅 {noticia.fecha} - {noticia.titulo}"
+
+def linea_titular(noticia):
+    return f"     {noticia.titular}"
+
+def alto_noticia(noticia):
+    """Alto en puntos de una noticia: título en negrita 12 pt y titular 11 pt con sus espaciados."""
+    return (lineas_texto(linea_titulo(noticia), 12) * 12 * INTERLINEADO + 5 + 2
+            + lineas_texto(linea_titular(noticia), 11) * 11 * INTERLINEADO + 8)
+
+def paginar_noticias(noticias, alto_primera, alto_continuacion):
+    """
+    Reparte las noticias en páginas sin superar el alto
+    disponible de cada caja (la primera es más baja por el resumen). Cada
+    página lleva al menos una noticia aunque no quepa entera.
+    """
+    paginas = [[]]
+    disponible = alto_primera
+    for noticia in noticias:
+        alto = alto_noticia(noticia)
+        if alto > disponible and paginas[-1]:
+            paginas.append([])
+            disponible = alto_continuacion
+        paginas[-1].append(noticia)
+        disponible -= alto
+    return paginas
+
+def agregar_caja_noticias(slide, top, alto, noticias):
+    news_box = slide.shapes.add_shape(
+        MSO_SHAPE.RECTANGLE,
+        Inches(1),
+        top,
+        Inches(8),
+        alto
+    )
+    news_box.fill.solid()
+    news_box.fill.fore_color.rgb = COLORES['blanco']
+    news_box.line.color.rgb = COLORES['gris_claro']
+    news_box.shadow.inherit = False
+    
+    tf = news_box.text_frame
+    tf.word_wrap = True
+    
+    escribir_noticias(tf, noticias)
+
+def crear_datos_cobertura(pr, cobertura, tipo_medio):
+    slide = nueva_diapositiva(pr)
+    
+    # Medio sin datos en el payload: diapositiva vacía
+    if cobertura is None:
+        return
+    
+    agregar_titulo_cobertura(slide, tipo_medio)
     
     # Caja de resumen con datos principales
     summary_box = slide.shapes.add_shape(
@@ -322,214 +503,27 @@ def crear_datos_cobertura(pr, datos, tipo_medio):
     tf = summary_box.text_frame
     tf.word_wrap = True
     
-    # Formatear valores monetarios con símbolo de euro
-    vpe_formateado = formatear_moneda(medio_data.get('total_vpe', 'N/A'))
-    vc_formateado = formatear_moneda(medio_data.get('total_vc', 'N/A'))
-    
     # Datos de resumen con iconos
-    p = tf.add_paragraph()
-    p.text = f"📊 Total de Noticias: {medio_data.get('cantidad_noticias', 'N/A')}"
-    p.font.name = FUENTES['cuerpo']
-    p.font.size = Pt(14)
-    p.font.color.rgb = COLORES['texto_oscuro']
-    
-    p = tf.add_paragraph()
-    p.text = f"👥 Audiencia Total: {medio_data.get('total_audiencia', 'N/A')}"
-    p.font.name = FUENTES['cuerpo']
-    p.font.size = Pt(14)
-    p.font.color.rgb = COLORES['texto_oscuro']
-    
-    p = tf.add_paragraph()
-    p.text = f"💰 VPE: {vpe_formateado} | VC: {vc_formateado}"
-    p.font.name = FUENTES['cuerpo']
-    p.font.size = Pt(14)
-    p.font.color.rgb = COLORES['texto_oscuro']
-    
-    # Lista de noticias
-    noticias_list = medio_data.get("noticias", [])
-    if noticias_list:
-        # Calcular cuántas noticias podemos mostrar por diapositiva (máx 4)
-        max_noticias_por_slide = min(4, len(noticias_list))
-        
-        news_box = slide.shapes.add_shape(
-            MSO_SHAPE.RECTANGLE,
-            Inches(1),
-            Inches(3.2),
-            Inches(8),
-            Inches(3)
-        )
-        news_box.fill.solid()
-        news_box.fill.fore_color.rgb = COLORES['blanco']
-        news_box.line.color.rgb = COLORES['gris_claro']
-        news_box.shadow.inherit = False
-        
-        tf = news_box.text_frame
-        tf.word_wrap = True
-        
-        p = tf.add_paragraph()
-        p.text = "📰 Noticias Destacadas"
-        p.font.name = FUENTES['subtitulo']
-        p.font.size = Pt(16)
-        p.font.color.rgb = COLORES['secundario']
-        p.space_after = Pt(10)
-        
-        # Añadir las primeras noticias
-        for i in range(max_noticias_por_slide):
-            if i >= len(noticias_list):
-                break
-                
-            noticia = noticias_list[i]
-            
-            # Formatear la fecha a DD-MM-AA
-            fecha_formateada = formatear_fecha(noticia.get('fecha', 'N/A'))
-            
-            p = tf.add_paragraph()
-            p.text = f"📅 {fecha_formateada} - {noticia.get('titulo', 'N/A')}"
-            p.font.name = FUENTES['cuerpo']
-            p.font.size = Pt(12)
-            p.font.color.rgb = COLORES['texto_oscuro']
-            p.font.bold = True
-            p.space_before = Pt(5)
-            p.space_after = Pt(2)
-            
-            # Párrafo con hipervínculo
-            p = tf.add_paragraph()
-            run = p.add_run()
-            run.text = f"     {noticia.get('titular', 'N/A')}"
-            run.font.name = FUENTES['cuerpo']
-            run.font.size = Pt(11)
-            run.font.color.rgb = COLORES['secundario']
-            run.font.italic = True
-            
-            # Añadir hipervínculo al titular
-            if 'url' in noticia and noticia['url']:
-                hlink = run.hyperlink
-                hlink.address = noticia['url']
-            elif 'link' in noticia and noticia['link']:
-                hlink = run.hyperlink
-                hlink.address = noticia['link']
-            
-            p.space_after = Pt(8)
+    escribir_parrafo(tf, f"📊 Total de Noticias: {cobertura.cantidad_noticias}", 'cuerpo')
+    escribir_parrafo(tf, f"👥 Audiencia Total: {cobertura.total_audiencia}", 'cuerpo')
+    escribir_parrafo(tf, f"💰 VPE: {cobertura.total_vpe} | VC: {cobertura.total_vc}", 'cuerpo')
+    
+    # Lista de noticias, repartida en tantas diapositivas de continuación como haga falta
+    if cobertura.noticias:
+        paginas = paginar_noticias(cobertura.noticias, ALTO_NOTICIAS_PRIMERA, ALTO_NOTICIAS_CONTINUACION)
+        agregar_caja_noticias(slide, CAJA_NOTICIAS_PRIMERA[0], CAJA_NOTICIAS_PRIMERA[1], paginas[0])
         
-        # Si hay más noticias, crear una nueva diapositiva
-        if len(noticias_list) > max_noticias_por_slide:
-            slide_continuacion = pr.slides.add_slide(pr.slide_layouts[5])
-            aplicar_estilo_slide(slide_continuacion)
-            
-            # Barra de título
-            title_box = slide_continuacion.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                0,
-                0,
-                Inches(10),
-                Inches(1)
-            )
-            title_box.fill.solid()
-            title_box.fill.fore_color.rgb = COLORES['principal']
-            title_box.line.fill.background()
-            
-            # Título principal
-            title = slide_continuacion.shapes.add_textbox(
-                Inches(1.8),
-                Inches(0.2),
-                Inches(6.4),
-                Inches(0.6)
-            )
-            tf = title.text_frame
-            tf.text = f"Datos de Cobertura - {tipo_medio}"
-            p = tf.paragraphs[0]
-            p.font.name = FUENTES['titulo']
-            p.font.size = Pt(28)
-            p.font.color.rgb = COLORES['blanco']
-            p.alignment = PP_ALIGN.CENTER
-            
-            # Subtítulo (Continuación) debajo del título principal
-            subtitle = slide_continuacion.shapes.add_textbox(
-                Inches(1.8),
-                Inches(0.6),  # Justo debajo del título
-                Inches(6.4),
-                Inches(0.4)
-            )
-            tf = subtitle.text_frame
-            tf.text = "(Continuación)"
-            p = tf.paragraphs[0]
-            p.font.name = FUENTES['subtitulo']
-            p.font.size = Pt(16)  # 40% más pequeño que el título principal
-            p.font.color.rgb = COLORES['blanco']
-            p.alignment = PP_ALIGN.CENTER
-            
-            # Caja de noticias
-            news_box = slide_continuacion.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(1),
-                Inches(1.5),
-                Inches(8),
-                Inches(5)
-            )
-            news_box.fill.solid()
-            news_box.fill.fore_color.rgb = COLORES['blanco']
-            news_box.line.color.rgb = COLORES['gris_claro']
-            news_box.shadow.inherit = False
-            
-            tf = news_box.text_frame
-            tf.word_wrap = True
-            
-            p = tf.add_paragraph()
-            p.text = "📰 Noticias Destacadas"
-            p.font.name = FUENTES['subtitulo']
-            p.font.size = Pt(16)
-            p.font.color.rgb = COLORES['secundario']
-            p.space_after = Pt(10)
-            
-            # Añadir las noticias restantes
-            for i in range(max_noticias_por_slide, len(noticias_list)):
-                noticia = noticias_list[i]
-                
-                # Formatear la fecha a DD-MM-AA
-                fecha_formateada = formatear_fecha(noticia.get('fecha', 'N/A'))
-                
-                p = tf.add_paragraph()
-                p.text = f"📅 {fecha_formateada} - {noticia.get('titulo', 'N/A')}"
-                p.font.name = FUENTES['cuerpo']
-                p.font.size = Pt(12)
-                p.font.color.rgb = COLORES['texto_oscuro']
-                p.font.bold = True
-                p.space_before = Pt(5)
-                p.space_after = Pt(2)
-                
-                # Párrafo con hipervínculo
-                p = tf.add_paragraph()
-                run = p.add_run()
-                run.text = f"     {noticia.get('titular', 'N/A')}"
-                run.font.name = FUENTES['cuerpo']
-                run.font.size = Pt(11)
-                run.font.color.rgb = COLORES['secundario']
-                run.font.italic = True
-                
-                # Añadir hipervínculo al titular
-                if 'url' in noticia and noticia['url']:
-                    hlink = run.hyperlink
-                    hlink.address = noticia['url']
-                elif 'link' in noticia and noticia['link']:
-                    hlink = run.hyperlink
-                    hlink.address = noticia['link']
-                
-                p.space_after = Pt(8)
-            
-            # Añadir logo a la diapositiva de continuación
-            agregar_logo(slide_continuacion)
+        for pagina in paginas[1:]:
+            slide_continuacion = nueva_diapositiva(pr)
+            agregar_titulo_cobertura(slide_continuacion, tipo_medio, continuacion=True)
+            agregar_caja_noticias(slide_continuacion, CAJA_NOTICIAS_CONTINUACION[0],
+                                  CAJA_NOTICIAS_CONTINUACION[1], pagina)
             add_footer(slide_continuacion, f"Cobertura {tipo_medio} - Informe de Medios")
     
-    # Añadir logo
-    agregar_logo(slide)
     add_footer(slide, f"Cobertura {tipo_medio} - Informe de Medios")
 
-def crear_graficos(pr, datos):
-    urls = datos.get("urls", [])
-    if not urls:
-        return
-    
-    # Ordenar los gráficos según el tipo y la secuencia deseada
+def ordenar_graficos(urls):
+    """Ordena los gráficos: primero los generales (barras, tortas), luego prensa, radio, TV y digitales."""
     graficos_ordenados = {
         'general': [],     # Gráficos generales (barras, tortas)
         'prensa': [],      # Gráficos de prensa
@@ -552,19 +546,100 @@ def crear_graficos(pr, datos):
             # Gráficos generales (barras, tortas)
             graficos_ordenados['general'].append(url)
     
-    # Procesar primero los gráficos generales
-    for url in graficos_ordenados['general']:
-        crear_diapositiva_grafico(pr, url)
+    return [url for tipo in ['general', 'prensa', 'radio', 'tv', 'digitales'] for url in graficos_ordenados[tipo]]
+
+def descargar_graficos(urls, progreso=None, limite=None):
+    """Descarga en paralelo los gráficos dentro del plazo que le queda al informe. Devuelve url -> bytes."""
+    plazo = GRAFICOS_DEADLINE
+    if limite is not None:
+        plazo = min(plazo, limite - time.time() - PLAZO_RESERVA)
+    with metricas.span('descarga_graficos', graficos=len(urls), plazo=round(plazo, 2)):
+        if plazo <= 0:
+            # Sin tiempo para descargar: todos los gráficos van directamente con el aviso
+            logging.error(f"Plazo del informe agotado, se omiten {len(urls)} gráficos")
+            metricas.incrementar('pptx_descargas_total', len(urls), resultado='plazo')
+            return {}
+        return prefetch_imagenes(
+            urls,
+            deadline=plazo,
+            al_completar=lambda hechas, total: notificar_progreso(
+                progreso, graficos_descargados=hechas, graficos_total=total),
+        )
+
+def crear_diapositivas_graficos(pr, urls, imagenes, progreso=None, degradados=None, bytes_graficos=None, series=None):
+    """Añade una diapositiva por gráfico, en el orden de `urls`, con las imágenes ya descargadas."""
+    for url in urls:
+        with metricas.span('grafico', url=url):
+            motivo = crear_diapositiva_grafico(pr, url, imagenes.get(url), bytes_graficos, serie_grafico(url, series))
+        if motivo and degradados is not None:
+            degradados.append({'url': url, 'motivo': motivo})
+        notificar_progreso(progreso, diapositivas=len(pr.slides))
+
+def registrar_bytes_graficos(bytes_graficos):
+    """Exporta y registra en el log cuánto se ahorró al optimizar los gráficos del informe."""
+    for etapa, total in bytes_graficos.items():
+        metricas.incrementar('pptx_imagenes_bytes_total', total, etapa=etapa)
+    if bytes_graficos['original']:
+        ahorro = bytes_graficos['original'] - bytes_graficos['incrustada']
+        logging.info(f"Gráficos optimizados: {bytes_graficos['original']} -> {bytes_graficos['incrustada']} bytes "
+                     f"({ahorro / bytes_graficos['original'] * 100:.0f}% menos)")
+
+def serie_grafico(url, series):
+    """
+    (nombre, SerieGrafico) del payload para el gráfico de `url` (su nombre
+    aparece en la URL), o None. El nombre es la clave de 'series', p. ej.
+    'vpe_torta', y decide el tipo de gráfico nativo.
+    """
+    for nombre in sorted(series or (), key=len, reverse=True):
+        if nombre in url:
+            return nombre, series[nombre]
+    return None
+
+def graficos_informe(informe):
+    """
+    Gráficos del informe: sus URLs o, si el payload solo trae 'series', los
+    nombres de las series, que sirven igual para el título y el orden.
+    """
+    return informe.urls or list(informe.series)
+
+def urls_a_descargar(informe):
+    """URLs de gráficos que no se pueden construir con las series del payload."""
+    return [url for url in informe.urls if serie_grafico(url, informe.series) is None]
+
+def crear_graficos(pr, urls, progreso=None, imagenes=None, limite=None, degradados=None, series=None):
+    """
+    Crea las diapositivas de gráficos. `imagenes` (url -> bytes) permite
+    pasar gráficos ya descargados, p. ej. compartidos por un lote de informes.
+    `limite` (time.time()) acota las descargas al plazo que le queda al
+    informe; los gráficos que no lleguen se sustituyen por el aviso y se
+    añaden a `degradados` como {'url', 'motivo'}. Los gráficos con datos en
+    `series` se dibujan como gráficos nativos, sin descargar su imagen.
+    """
+    if not urls:
+        return
+    
+    # Descargar todos los gráficos en paralelo antes de construir las diapositivas
+    if imagenes is None:
+        pendientes = [url for url in urls if serie_grafico(url, series) is None]
+        imagenes = descargar_graficos(pendientes, progreso, limite) if pendientes else {}
     
-    # Procesar los gráficos en el orden específico: prensa, radio, TV, digitales
-    for tipo in ['prensa', 'radio', 'tv', 'digitales']:
-        for url in graficos_ordenados[tipo]:
-            crear_diapositiva_grafico(pr, url)
+    bytes_graficos = {'original': 0, 'incrustada': 0}
+    crear_diapositivas_graficos(pr, ordenar_graficos(urls), imagenes, progreso, degradados, bytes_graficos, series)
+    registrar_bytes_graficos(bytes_graficos)
 
-def crear_diapositiva_grafico(pr, url):
-    """Crea una diapositiva para un gráfico específico."""
-    slide = pr.slides.add_slide(pr.slide_layouts[5])
-    aplicar_estilo_slide(slide)
+def crear_diapositiva_grafico(pr, url, img_bytes, bytes_graficos=None, serie=None):
+    """
+    Crea una diapositiva para un gráfico específico.
+    Con `serie` (nombre y SerieGrafico, ver serie_grafico) se dibuja un
+    gráfico nativo de PowerPoint; si no, img_bytes es la imagen ya
+    descargada, o None si la descarga falló.
+    Se incrusta reescalada al tamaño del marco (ver app.optimizacion_imagenes);
+    `bytes_graficos`, si se indica, acumula los bytes 'original' e 'incrustada'.
+    Devuelve None si se insertó el gráfico, o el motivo por el que se
+    mostró un aviso en su lugar ('descarga' o 'formato').
+    """
+    slide = nueva_diapositiva(pr)
+    degradado = None
     
     # Determinar tipo de gráfico y título
     tipo_grafico = ""
@@ -597,18 +672,6 @@ def crear_diapositiva_grafico(pr, url):
             tipo_grafico = f"Top VPE - {medio}"
             subtitulo = "Detalles"
     
-    # Barra de título
-    title_box = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        0,
-        0,
-        Inches(10),
-        Inches(1)
-    )
-    title_box.fill.solid()
-    title_box.fill.fore_color.rgb = COLORES['principal']
-    title_box.line.fill.background()
-    
     # Título centrado horizontalmente, ajustado para no solaparse con el logo
     title = slide.shapes.add_textbox(
         Inches(1.8),  # Ajustar para dejar espacio al logo
@@ -617,12 +680,7 @@ def crear_diapositiva_grafico(pr, url):
         Inches(0.6)
     )
     tf = title.text_frame
-    tf.text = tipo_grafico
-    p = tf.paragraphs[0]
-    p.font.name = FUENTES['titulo']
-    p.font.size = Pt(28)
-    p.font.color.rgb = COLORES['blanco']
-    p.alignment = PP_ALIGN.CENTER
+    escribir_parrafo(tf, tipo_grafico, 'titulo', nuevo=False)
     
     # Añadir subtítulo si es necesario
     if subtitulo:
@@ -633,32 +691,7 @@ def crear_diapositiva_grafico(pr, url):
             Inches(0.4)
         )
         tf = subtitle.text_frame
-        tf.text = subtitulo
-        p = tf.paragraphs[0]
-        p.font.name = FUENTES['subtitulo']
-        p.font.size = Pt(20)
-        p.font.color.rgb = COLORES['secundario']
-        p.alignment = PP_ALIGN.CENTER
-    
-    # Primero descargamos la imagen del gráfico
-    img_path = None
-    try:
-        # Usar requests para descargar la imagen
-        temp_dir = tempfile.gettempdir()
-        img_path = os.path.join(temp_dir, f"grafico_{hash(url)}.png")
-        
-        response = requests.get(url, stream=True, timeout=15)
-        if response.status_code == 200:
-            with open(img_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            logging.info(f"Gráfico descargado correctamente: {url}")
-        else:
-            logging.error(f"Error al descargar gráfico: {response.status_code}")
-            img_path = None
-    except Exception as e:
-        logging.error(f"Error descargando gráfico {url}: {e}")
-        img_path = None
+        escribir_parrafo(tf, subtitulo, 'subtitulo', nuevo=False)
     
     # Área de contenido principal (centrado en la diapositiva)
     content_area_top = Inches(1.7) if subtitulo else Inches(1.5)
@@ -680,12 +713,24 @@ def crear_diapositiva_grafico(pr, url):
     chart_frame.line.width = Pt(2)
     chart_frame.shadow.inherit = False
     
+    if serie is not None:
+        # Gráfico nativo a partir de los datos del payload, con el mismo margen que la imagen
+        nombre_serie, datos_serie = serie
+        agregar_grafico_nativo(
+            slide,
+            nombre_serie,
+            datos_serie,
+            content_area_left + Inches(0.5),
+            content_area_top + Inches(0.25),
+            content_area_width - Inches(1),
+            content_area_height - Inches(0.5)
+        )
+    
     # Intentar insertar el gráfico si se descargó correctamente
-    if img_path and os.path.exists(img_path) and os.path.getsize(img_path) > 0:
+    elif img_bytes:
         try:
-            # Obtener dimensiones de la imagen
-            img = Image.open(img_path)
-            img_width, img_height = img.size
+            # Obtener dimensiones de la cabecera, sin decodificar la imagen
+            img_width, img_height = dimensiones_imagen(img_bytes)
             aspect_ratio = img_width / img_height
             
             # Calcular tamaño manteniendo proporción
@@ -711,9 +756,12 @@ def crear_diapositiva_grafico(pr, url):
             left = content_area_left + (content_area_width - target_width) / 2
             top = content_area_top + (content_area_height - target_height) / 2
             
+            # Reescalar y recomprimir al tamaño real del marco antes de incrustar
+            incrustada = optimizar_imagen(img_bytes, target_width, target_height)
+            
             # Insertar imagen del gráfico
             pic = slide.shapes.add_picture(
-                img_path,
+                io.BytesIO(incrustada),
                 left,
                 top,
                 width=target_width,
@@ -722,9 +770,13 @@ def crear_diapositiva_grafico(pr, url):
             
             # Asegurarse de que el gráfico esté en primer plano
             pic.z_order = -1  # Poner en primer plano
+            if bytes_graficos is not None:
+                bytes_graficos['original'] += len(img_bytes)
+                bytes_graficos['incrustada'] += len(incrustada)
             
         except Exception as e:
             logging.error(f"Error al insertar gráfico {url}: {e}")
+            degradado = 'formato'
             
             # Mostrar mensaje de error
             error_box = slide.shapes.add_textbox(
@@ -734,21 +786,10 @@ def crear_diapositiva_grafico(pr, url):
                 Inches(1)
             )
             tf = error_box.text_frame
-            tf.text = "Error al cargar el gráfico"
-            p = tf.paragraphs[0]
-            p.font.color.rgb = COLORES['acento']
-            p.font.size = Pt(16)
-            p.font.bold = True
-            p.alignment = PP_ALIGN.CENTER
-        finally:
-            # Limpiar archivo temporal
-            try:
-                if os.path.exists(img_path):
-                    os.remove(img_path)
-            except:
-                pass
+            escribir_parrafo(tf, "Error al cargar el gráfico", 'aviso', nuevo=False)
     else:
         # Mostrar mensaje de error si no se pudo descargar
+        degradado = 'descarga'
         error_box = slide.shapes.add_textbox(
             content_area_left + Inches(1.5),
             content_area_top + Inches(2),
@@ -756,32 +797,64 @@ def crear_diapositiva_grafico(pr, url):
             Inches(1)
         )
         tf = error_box.text_frame
-        tf.text = "Error al descargar el gráfico"
-        p = tf.paragraphs[0]
-        p.font.color.rgb = COLORES['acento']
-        p.font.size = Pt(16)
-        p.font.bold = True
-        p.alignment = PP_ALIGN.CENTER
-    
-    # Añadir logo
-    agregar_logo(slide)
+        escribir_parrafo(tf, "Error al descargar el gráfico", 'aviso', nuevo=False)
+    
     add_footer(slide, f"{tipo_grafico} - Informe de Medios")
+    return degradado
 
-def crear_vpe_totales(pr, datos):
-    slide = pr.slides.add_slide(pr.slide_layouts[5])
-    aplicar_estilo_slide(slide)
+def agregar_grafico_nativo(slide, nombre, serie, left, top, width, height):
+    """
+    Dibuja una serie como gráfico de PowerPoint según su nombre en 'series'
+    (no la URL, que puede contener cualquier cosa): tarta para los '*_torta',
+    barras horizontales para los top 10 y columnas para el resto.
+    """
+    datos = CategoryChartData(number_format='#,##0')
+    datos.categories = serie.categorias
+    datos.add_series("VPE" if "vpe" in nombre else "Impactos", serie.valores)
     
-    # Barra de título horizontal
-    title_box = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        0,
-        0,
-        Inches(10),
-        Inches(1)
-    )
-    title_box.fill.solid()
-    title_box.fill.fore_color.rgb = COLORES['principal']
-    title_box.line.fill.background()
+    if "torta" in nombre:
+        tipo = XL_CHART_TYPE.PIE
+    elif "top10" in nombre:
+        tipo = XL_CHART_TYPE.BAR_CLUSTERED
+    else:
+        tipo = XL_CHART_TYPE.COLUMN_CLUSTERED
+    chart = slide.shapes.add_chart(tipo, left, top, width, height, datos).chart
+    
+    chart.font.name = FUENTES['cuerpo']
+    chart.font.size = Pt(11)
+    chart.font.color.rgb = COLORES['texto_oscuro']
+    plot = chart.plots[0]
+    plot.has_data_labels = True
+    etiquetas = plot.data_labels
+    
+    if tipo == XL_CHART_TYPE.PIE:
+        chart.has_legend = True
+        chart.legend.position = XL_LEGEND_POSITION.RIGHT
+        chart.legend.include_in_layout = False
+        etiquetas.show_percentage = True
+        etiquetas.show_value = False
+        etiquetas.number_format = '0%'
+        etiquetas.number_format_is_linked = False
+        etiquetas.position = XL_LABEL_POSITION.OUTSIDE_END
+        return
+    
+    chart.has_legend = False
+    plot.gap_width = 60
+    plot.series[0].format.fill.solid()
+    plot.series[0].format.fill.fore_color.rgb = COLORES['principal']
+    etiquetas.number_format = '#,##0'
+    etiquetas.number_format_is_linked = False
+    etiquetas.position = XL_LABEL_POSITION.OUTSIDE_END
+    chart.value_axis.has_major_gridlines = True
+    chart.value_axis.major_gridlines.format.line.color.rgb = COLORES['gris_claro']
+    chart.value_axis.tick_labels.number_format = '#,##0'
+    chart.value_axis.tick_labels.number_format_is_linked = False
+    if tipo == XL_CHART_TYPE.BAR_CLUSTERED:
+        # El primero del top 10 arriba, como en la imagen
+        chart.category_axis.reverse_order = True
+
+def crear_vpe_totales(pr, informe):
+    slide = nueva_diapositiva(pr)
     
     # Título centrado horizontalmente, ajustado para no solaparse con el logo
     title = slide.shapes.add_textbox(
@@ -791,12 +864,7 @@ def crear_vpe_totales(pr, datos):
         Inches(0.6)
     )
     tf = title.text_frame
-    tf.text = "Valor Publicitario Equivalente (VPE) Total"
-    p = tf.paragraphs[0]
-    p.font.name = FUENTES['titulo']
-    p.font.size = Pt(28)
-    p.font.color.rgb = COLORES['blanco']
-    p.alignment = PP_ALIGN.CENTER
+    escribir_parrafo(tf, "Valor Publicitario Equivalente (VPE) Total", 'titulo', nuevo=False)
     
     # Caja de datos VPE
     vpe_box = slide.shapes.add_shape(
@@ -814,59 +882,235 @@ def crear_vpe_totales(pr, datos):
     tf = vpe_box.text_frame
     tf.word_wrap = True
     
-    p = tf.add_paragraph()
-    p.text = "Resumen de Valor Publicitario"
-    p.font.name = FUENTES['subtitulo']
-    p.font.size = Pt(20)
-    p.font.color.rgb = COLORES['secundario']
-    p.alignment = PP_ALIGN.CENTER
-    p.space_after = Pt(20)
+    escribir_parrafo(tf, "Resumen de Valor Publicitario", 'resumen_vpe')
+    escribir_parrafo(tf, f"VPE Total: {informe.total_global_vpe}", 'total_vpe')
     
-    # Formatear el valor VPE con símbolo de euro
-    vpe_formateado = formatear_moneda(datos.get('totalGlobalVPE', 'N/A'))
-    
-    p = tf.add_paragraph()
-    p.text = f"VPE Total: {vpe_formateado}"
-    p.font.name = FUENTES['cuerpo']
-    p.font.size = Pt(28)
-    p.font.color.rgb = COLORES['principal']
-    p.font.bold = True
-    p.alignment = PP_ALIGN.CENTER
-    
-    # Añadir logo
-    agregar_logo(slide)
     add_footer(slide, "VPE Total - Informe de Medios")
 
-def generar_pptx(data, filename):
-    pr = Presentation()
+def notificar_progreso(progreso, **campos):
+    """Informa del avance al callback opcional sin que un fallo suyo aborte el informe."""
+    if progreso is None:
+        return
+    try:
+        progreso(**campos)
+    except Exception as e:
+        logging.error(f"Error al notificar el progreso: {e}")
+
+def construir_seccion(seccion, datos, imagenes=None):
+    """
+    Se ejecuta en el pool de app.fragmentos: construye una sección en una
+    presentación propia y devuelve (fragmentos, degradados, bytes_graficos).
+    `seccion` es un medio (datos: su CoberturaMedio o None) o 'graficos'
+    (datos: URLs ya ordenadas, imagenes: sus bytes).
+    """
+    pr = nueva_presentacion()
+    degradados = []
+    bytes_graficos = {'original': 0, 'incrustada': 0}
+    if seccion == 'graficos':
+        crear_diapositivas_graficos(pr, datos, imagenes, degradados=degradados, bytes_graficos=bytes_graficos)
+    else:
+        crear_datos_cobertura(pr, datos, seccion)
+    return [extraer_fragmento(slide) for slide in pr.slides], degradados, bytes_graficos
+
+def usar_secciones_paralelas(informe):
+    """Solo compensa repartir el informe entre procesos cuando tiene muchas noticias."""
+    noticias = sum(len(cobertura.noticias) for cobertura in informe.coberturas.values())
+    return fragmentos.disponible() and noticias >= fragmentos.SECCIONES_UMBRAL
+
+def construir_en_paralelo(pr, informe, progreso=None, imagenes=None, limite=None, degradados=None):
+    """
+    Cuerpo de generar_pptx para informes grandes: las coberturas y los
+    gráficos (en PPTX_SECCIONES_WORKERS tramos) se construyen en procesos y
+    sus diapositivas se insertan en el mismo orden que en serie, con el
+    mismo resultado. La portada, las descargas y el VPE total se hacen aquí
+    mientras tanto. Cada sección se espera como mucho hasta `limite`.
+    """
+    pool = fragmentos.obtener_pool()
+    coberturas = [pool.submit(construir_seccion, medio, informe.coberturas.get(medio)) for medio in MEDIOS]
+    graficos = []
     
-    # Validación de datos de entrada
-    if not isinstance(data, (list, dict)):
-        logging.error("Input data must be a list or dict.")
-        raise ValueError("Input data must be a list or dict.")
+    def resultado(future):
+        restante = None if limite is None else max(0, limite - time.time())
+        try:
+            return future.result(timeout=restante)
+        except FuturesTimeoutError:
+            # Sin esto el hilo seguiría esperando y el hueco del pool no se liberaría nunca
+            for pendiente in coberturas + graficos:
+                pendiente.cancel()
+            raise TimeoutError("Las secciones del informe no terminaron dentro del plazo") from None
     
-    datos = data[0] if isinstance(data, list) and data else data
-    if not isinstance(datos, dict):
-        logging.error("No se pudo extraer el objeto de datos principal.")
-        raise ValueError("No se pudo extraer el objeto de datos principal.")
+    with metricas.span('portada'):
+        crear_portada(pr, informe)
+    notificar_progreso(progreso, diapositivas=len(pr.slides))
     
-    # Generar estructura de presentación
-    crear_portada(pr, datos)
+    # Los gráficos nativos llevan sus propias partes (gráfico y hoja de datos), que no viajan
+    # en un fragmento: con series en el payload todos los gráficos se hacen aquí, al final
+    urls = [] if informe.series else ordenar_graficos(informe.urls)
+    if urls and imagenes is None:
+        imagenes = descargar_graficos(informe.urls, progreso, limite)
+    tramo = max(1, -(-len(urls) // fragmentos.SECCIONES_WORKERS))
+    graficos.extend(
+        pool.submit(construir_seccion, 'graficos', urls[i:i + tramo], {url: imagenes.get(url) for url in urls[i:i + tramo]})
+        for i in range(0, len(urls), tramo)
+    )
     
-    # Datos de cobertura por tipo de medio
-    for medio in ["TV", "Radio", "Prensa", "Medios Digitales"]:
-        crear_datos_cobertura(pr, datos, medio)
+    for medio, future in zip(MEDIOS, coberturas):
+        with metricas.span('cobertura', medio=medio):
+            for fragmento in resultado(future)[0]:
+                insertar_fragmento(pr, fragmento)
+        notificar_progreso(progreso, diapositivas=len(pr.slides))
     
-    crear_vpe_totales(pr, datos)
-    crear_graficos(pr, datos)
+    with metricas.span('vpe_totales'):
+        crear_vpe_totales(pr, informe)
+    notificar_progreso(progreso, diapositivas=len(pr.slides))
+    if informe.series:
+        crear_graficos(pr, graficos_informe(informe), progreso, imagenes, limite, degradados, informe.series)
     
-    # Guardar presentación
-    output_path = f"/tmp/{filename}"
-    try:
-        pr.save(output_path)
-        logging.info(f"Presentación PPTX guardada en: {output_path}")
-    except Exception as e:
-        logging.error(f"Error al guardar la presentación PPTX: {e}")
-        raise
+    bytes_graficos = {'original': 0, 'incrustada': 0}
+    for future in graficos:
+        with metricas.span('graficos'):
+            diapositivas, degradados_tramo, bytes_tramo = resultado(future)
+            for fragmento in diapositivas:
+                insertar_fragmento(pr, fragmento)
+        if degradados is not None:
+            degradados.extend(degradados_tramo)
+        for etapa, total in bytes_tramo.items():
+            bytes_graficos[etapa] += total
+        notificar_progreso(progreso, diapositivas=len(pr.slides))
+    if urls:
+        registrar_bytes_graficos(bytes_graficos)
+
+def generar_pptx(data, salida=None, progreso=None, imagenes=None, limite=None, degradados=None):
+    """
+    Genera la presentación y la escribe en `salida` (un objeto tipo archivo).
+    Si no se indica, usa un SpooledTemporaryFile que solo pasa a disco si
+    supera PPTX_SPOOL_MAX bytes y se borra solo al cerrarlo.
+    `progreso`, si se indica, se llama con diapositivas=..., y con
+    graficos_descargados=... / graficos_total=... a medida que avanza.
+    `imagenes` (url -> bytes) evita descargar gráficos ya obtenidos.
+    `limite` es el instante (time.time()) en que debe estar listo el informe:
+    las descargas se cortan a tiempo y los gráficos que falten se sustituyen
+    por un aviso, anotándose en la lista `degradados` si se indica (también
+    la falta de logo, ver nueva_presentacion).
+    `data` es el JSON recibido o un Informe ya validado.
+    Devuelve el objeto de salida posicionado al inicio.
+    """
+    # Cada fase queda medida en /metrics y en una línea de traza por informe
+    with metricas.traza():
+        # Validación de datos de entrada, antes de tocar ninguna diapositiva
+        with metricas.span('validacion'):
+            informe = data if isinstance(data, Informe) else Informe.desde_json(data)
+        
+        with metricas.span('clonar_base'):
+            pr = nueva_presentacion(degradados)
+        
+        if usar_secciones_paralelas(informe):
+            construir_en_paralelo(pr, informe, progreso, imagenes, limite, degradados)
+            return guardar_presentacion(pr, salida)
+        
+        # Generar estructura de presentación
+        with metricas.span('portada'):
+            crear_portada(pr, informe)
+        notificar_progreso(progreso, diapositivas=len(pr.slides))
+        
+        # Datos de cobertura por tipo de medio
+        for medio in MEDIOS:
+            with metricas.span('cobertura', medio=medio):
+                crear_datos_cobertura(pr, informe.coberturas.get(medio), medio)
+            notificar_progreso(progreso, diapositivas=len(pr.slides))
+        
+        with metricas.span('vpe_totales'):
+            crear_vpe_totales(pr, informe)
+        notificar_progreso(progreso, diapositivas=len(pr.slides))
+        crear_graficos(pr, graficos_informe(informe), progreso, imagenes, limite, degradados, informe.series)
+        
+        return guardar_presentacion(pr, salida)
+
+def generar_pptx_incremental(miembros, salida=None, progreso=None, limite=None, degradados=None):
+    """
+    Variante de generar_pptx para cuerpos grandes leídos por partes.
+    `miembros` genera (clave, valor) del objeto principal según llegan (ver
+    app.ingesta): cada bloque {medio}_raw se convierte en diapositivas en
+    cuanto se recibe y se libera, así que nunca se tiene el payload entero
+    en memoria. Cada bloque se valida al llegar y el resto de campos al
+    terminar la lectura. Al final se reordenan las diapositivas como en generar_pptx.
+    """
+    with metricas.traza():
+        with metricas.span('clonar_base'):
+            pr = nueva_presentacion(degradados)
+        
+        datos = {}
+        coberturas = {}  # medio -> índices de sus diapositivas
+        for clave, valor in miembros:
+            medio = clave[:-len('_raw')] if clave.endswith('_raw') else None
+            if medio not in MEDIOS or medio in coberturas:
+                datos[clave] = valor
+                continue
+            with metricas.span('validacion', medio=medio):
+                cobertura = CoberturaMedio.desde_json(medio, valor)
+            inicio = len(pr.slides)
+            with metricas.span('cobertura', medio=medio):
+                crear_datos_cobertura(pr, cobertura, medio)
+            coberturas[medio] = range(inicio, len(pr.slides))
+            notificar_progreso(progreso, diapositivas=len(pr.slides))
+        
+        with metricas.span('validacion'):
+            informe = Informe.desde_json(datos)
+        
+        # Medios ausentes en el payload: misma diapositiva vacía que generar_pptx
+        for medio in MEDIOS:
+            if medio not in coberturas:
+                inicio = len(pr.slides)
+                crear_datos_cobertura(pr, None, medio)
+                coberturas[medio] = range(inicio, len(pr.slides))
+        
+        # La portada necesita las fechas, que pueden llegar tras los bloques de medios
+        with metricas.span('portada'):
+            portada = len(pr.slides)
+            crear_portada(pr, informe)
+        ordenar_diapositivas(pr, [portada] + [i for medio in MEDIOS for i in coberturas[medio]])
+        notificar_progreso(progreso, diapositivas=len(pr.slides))
+        
+        with metricas.span('vpe_totales'):
+            crear_vpe_totales(pr, informe)
+        notificar_progreso(progreso, diapositivas=len(pr.slides))
+        crear_graficos(pr, graficos_informe(informe), progreso, limite=limite, degradados=degradados,
+                       series=informe.series)
+        
+        return guardar_presentacion(pr, salida)
+
+def ordenar_diapositivas(pr, orden):
+    """Reordena las diapositivas según `orden`, una lista con sus índices actuales."""
+    lista = pr.slides._sldIdLst
+    actuales = list(lista)
+    for sld_id in actuales:
+        lista.remove(sld_id)
+    for i in orden:
+        lista.append(actuales[i])
+
+def guardar_presentacion(pr, salida=None):
+    """
+    Guarda la presentación en `salida` o, si no se indica, en un
+    SpooledTemporaryFile, y la devuelve posicionada al inicio.
+    """
+    # Guardar presentación sin pasar por /tmp
+    if salida is None:
+        salida = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+    with metricas.span('guardado') as atributos:
+        try:
+            pr.save(salida)
+            atributos['bytes'] = salida.tell()
+            logging.info(f"Presentación PPTX generada ({salida.tell()} bytes)")
+        except Exception as e:
+            salida.close()
+            logging.error(f"Error al guardar la presentación PPTX: {e}")
+            raise
     
-    return output_path
+    metricas.observar('pptx_informe_bytes', salida.tell())
+    salida.seek(0)
+    return salida
+
+def generar_pptx_bytes(data, imagenes=None, limite=None, degradados=None):
+    """Variante de generar_pptx que devuelve los bytes (para pools de procesos)."""
+    with generar_pptx(data, io.BytesIO(), imagenes=imagenes, limite=limite, degradados=degradados) as salida:
+        return salida.getvalue()
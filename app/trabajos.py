@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from app.ppt_generator import generar_pptx
+
+# Almacén de trabajos en SQLite (compartido entre hilos y procesos trabajadores)
+TRABAJOS_DIR = os.environ.get("PPTX_TRABAJOS_DIR", os.path.join(tempfile.gettempdir(), "pptx_trabajos"))
+TRABAJOS_DB = os.path.join(TRABAJOS_DIR, "trabajos.sqlite3")
+TRABAJOS_TTL = float(os.environ.get("PPTX_TRABAJOS_TTL", "3600"))  # Segundos que se conserva el resultado
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    creado REAL NOT NULL,
+    terminado REAL,
+    diapositivas INTEGER NOT NULL DEFAULT 0,
+    graficos_descargados INTEGER NOT NULL DEFAULT 0,
+    graficos_total INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER,
+    error TEXT,
+    degradados TEXT
+)
+"""
+
+@contextmanager
+def _conectar():
+    """Conexión de corta duración: confirma al salir del bloque y se cierra."""
+    os.makedirs(TRABAJOS_DIR, exist_ok=True)
+    conexion = sqlite3.connect(TRABAJOS_DB, timeout=10)
+    try:
+        conexion.row_factory = sqlite3.Row
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute(ESQUEMA)
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+def ruta_resultado(trabajo_id):
+    return os.path.join(TRABAJOS_DIR, f"{trabajo_id}.pptx")
+
+def _actualizar(trabajo_id, **campos):
+    asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+    with _conectar() as conexion:
+        conexion.execute(f"UPDATE trabajos SET {asignaciones} WHERE id = ?", (*campos.values(), trabajo_id))
+
+def crear():
+    """Registra un trabajo pendiente y devuelve su id."""
+    trabajo_id = uuid.uuid4().hex
+    with _conectar() as conexion:
+        conexion.execute(
+            "INSERT INTO trabajos (id, estado, creado) VALUES (?, 'pendiente', ?)",
+            (trabajo_id, time.time()),
+        )
+    return trabajo_id
+
+def obtener(trabajo_id):
+    """Devuelve el estado del trabajo como dict, o None si no existe o ya expiró."""
+    with _conectar() as conexion:
+        fila = conexion.execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+    if fila is None:
+        return None
+    trabajo = dict(fila)
+    trabajo['degradados'] = json.loads(trabajo['degradados']) if trabajo['degradados'] else []
+    if trabajo['terminado']:
+        if time.time() - trabajo['terminado'] > TRABAJOS_TTL:
+            return None
+        trabajo['expira'] = trabajo['terminado'] + TRABAJOS_TTL
+    return trabajo
+
+def actualizar_estado(trabajo_id, estado):
+    """Marca un trabajo como terminado con el estado indicado (p. ej. 'rechazado')."""
+    _actualizar(trabajo_id, estado=estado, terminado=time.time())
+
+def actualizar_progreso(trabajo_id, **progreso):
+    """Callback de progreso de generar_pptx (diapositivas, graficos_descargados, graficos_total)."""
+    try:
+        _actualizar(trabajo_id, **progreso)
+    except sqlite3.Error as e:
+        logging.error(f"Error al actualizar el progreso del trabajo {trabajo_id}: {e}")
+
+def ejecutar(trabajo_id, data):
+    """Genera el informe de un trabajo en el pool y guarda el resultado en disco."""
+    _actualizar(trabajo_id, estado='en_curso')
+    ruta = ruta_resultado(trabajo_id)
+    degradados = []
+    try:
+        with open(ruta, 'wb') as salida:
+            generar_pptx(data, salida, progreso=partial(actualizar_progreso, trabajo_id), degradados=degradados)
+        tamano = os.path.getsize(ruta)
+        _actualizar(trabajo_id, estado='completado', terminado=time.time(), bytes=tamano,
+                    degradados=json.dumps(degradados, ensure_ascii=False))
+        logging.info(f"Trabajo {trabajo_id} completado ({tamano} bytes, {len(degradados)} gráficos degradados)")
+    except Exception as e:
+        logging.error(f"Error en el trabajo {trabajo_id}: {e}")
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        _actualizar(trabajo_id, estado='error', terminado=time.time(), error=str(e))
+
+def purgar_expirados():
+    """
+    Elimina los trabajos terminados hace más de TRABAJOS_TTL y sus archivos,
+    además de los que nunca terminaron (p. ej. por un reinicio) tras el doble de tiempo.
+    """
+    ahora = time.time()
+    condicion = "(terminado IS NOT NULL AND terminado < ?) OR creado < ?"
+    parametros = (ahora - TRABAJOS_TTL, ahora - 2 * TRABAJOS_TTL)
+    with _conectar() as conexion:
+        ids = [fila['id'] for fila in conexion.execute(f"SELECT id FROM trabajos WHERE {condicion}", parametros)]
+        conexion.execute(f"DELETE FROM trabajos WHERE {condicion}", parametros)
+    for trabajo_id in ids:
+        try:
+            os.remove(ruta_resultado(trabajo_id))
+        except OSError:
+            pass
+    if ids:
+        logging.info(f"Eliminados {len(ids)} trabajos expirados")
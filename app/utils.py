@@ -1,31 +1,186 @@
 import requests
-from uuid import uuid4
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import concurrent.futures
 import logging # Añadir esta importación para logging
+import io
+import itertools
+import os
+import struct
+import threading
+import time
+from PIL import Image
+from app import cache_imagenes, http_client, metricas
 
 # Configurar logging (opcional, pero ayuda a ver los mensajes en los logs de Render)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Pool compartido para descargas concurrentes de imágenes
+DESCARGA_CONCURRENCIA = int(os.environ.get("PPTX_DESCARGA_CONCURRENCIA", "16"))
+_pool_descargas = ThreadPoolExecutor(max_workers=DESCARGA_CONCURRENCIA, thread_name_prefix="descargas")
+
+# Descargas en curso en el proceso: url -> Future con (contenido, resultado), compartido
+# por todas las solicitudes que piden la misma URL a la vez
+_en_curso = {}
+_en_curso_lock = threading.Lock()
+
 def download_image(url):
+    """
+    Descarga una imagen y la devuelve como objeto tipo archivo en memoria,
+    listo para slide.shapes.add_picture, o None si falla.
+    """
+    contenido = descargar_bytes(url)
+    if contenido is None:
+        return None
+    return io.BytesIO(contenido)
+
+# Marcadores JPEG de inicio de trama (SOFn) que contienen las dimensiones
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def dimensiones_imagen(contenido):
+    """
+    Devuelve (ancho_px, alto_px) leyendo solo la cabecera PNG, JPEG o GIF,
+    sin decodificar la imagen. Para otros formatos recurre a Pillow.
+    """
+    if contenido[:8] == b'\x89PNG\r\n\x1a\n' and contenido[12:16] == b'IHDR':
+        return struct.unpack('>II', contenido[16:24])
+    
+    if contenido[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', contenido[6:10])
+    
+    if contenido[:2] == b'\xff\xd8':
+        pos = 2
+        while pos + 9 < len(contenido):
+            if contenido[pos] != 0xFF:
+                pos += 1
+                continue
+            marcador = contenido[pos + 1]
+            if marcador == 0xFF:  # Relleno entre marcadores
+                pos += 1
+                continue
+            longitud = struct.unpack('>H', contenido[pos + 2:pos + 4])[0]
+            if marcador in _JPEG_SOF:
+                alto, ancho = struct.unpack('>HH', contenido[pos + 5:pos + 9])
+                return ancho, alto
+            pos += 2 + longitud
+    
+    with Image.open(io.BytesIO(contenido)) as img:
+        return img.size
+
+def descargar_bytes(url, timeout=15):
+    """
+    Devuelve el contenido de una URL, o None si falla. Pasa por la caché de
+    imágenes: las entradas frescas no tocan la red y las caducadas se
+    revalidan con un GET condicional (ETag / Last-Modified).
+    """
+    inicio = time.perf_counter()
+    with metricas.span('descarga_imagen', url=url) as atributos:
+        contenido, resultado = _obtener_compartido(url, timeout)
+        atributos.update(resultado=resultado, bytes=len(contenido) if contenido else 0)
+    
+    metricas.incrementar('pptx_descargas_total', resultado=resultado)
+    metricas.observar('pptx_descarga_segundos', time.perf_counter() - inicio, resultado=resultado)
+    if contenido:
+        metricas.observar('pptx_descarga_bytes', len(contenido))
+    return contenido
+
+def _obtener_compartido(url, timeout):
+    """
+    Como _obtener, pero si otra solicitud ya está descargando la misma URL
+    espera a esa transferencia (como mucho `timeout`) y usa sus bytes.
+    """
+    with _en_curso_lock:
+        future = _en_curso.get(url)
+        propia = future is None
+        if propia:
+            future = _en_curso[url] = Future()
+    
+    if not propia:
+        try:
+            contenido, _ = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            logging.error(f"Timeout esperando la descarga en curso de: {url}")
+            return None, 'error'
+        return contenido, 'compartida' if contenido else 'error'
+    
     try:
-        # Añadir un timeout para evitar que las solicitudes se queden colgadas indefinidamente
-        response = requests.get(url, timeout=15) # Puedes ajustar el valor del timeout
-        if response.status_code == 200:
-            path = f"/tmp/{uuid4()}.png"
-            with open(path, "wb") as f:
-                f.write(response.content)
-            logging.info(f"Imagen descargada exitosamente: {url} a {path}")
-            return path
-        else:
-            # Registrar el código de estado si no es 200
-            logging.error(f"Error al descargar imagen {url}: Status {response.status_code}. Contenido: {response.text[:200]}")
+        resultado = _obtener(url, timeout)
+        future.set_result(resultado)
+        return resultado
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _en_curso_lock:
+            del _en_curso[url]
+
+def _obtener(url, timeout):
+    """Devuelve (contenido o None, resultado) donde resultado indica de dónde salió."""
+    entrada = cache_imagenes.buscar(url)
+    if entrada and cache_imagenes.esta_fresca(entrada):
+        return entrada['bytes'], 'cache'
+    
+    try:
+        response = http_client.get(url, headers=cache_imagenes.cabeceras_validacion(entrada), timeout=timeout)
+        if response.status_code == 304 and entrada:
+            cache_imagenes.revalidar(url, entrada)
+            logging.info(f"Imagen sin cambios en el servidor, se usa la caché: {url}")
+            return entrada['bytes'], 'revalidada'
+        if response.status_code == 200 and response.content:
+            logging.info(f"Imagen descargada exitosamente: {url} ({len(response.content)} bytes)")
+            cache_imagenes.guardar(
+                url,
+                response.content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+            return response.content, 'red'
+        logging.error(f"Error al descargar imagen {url}: Status {response.status_code}")
     except requests.exceptions.Timeout:
         logging.error(f"Timeout al descargar imagen desde: {url}")
-    except requests.exceptions.ConnectionError as e:
-        logging.error(f"Error de conexión al descargar imagen desde {url}: {e}")
     except requests.exceptions.RequestException as e:
-        # Captura otros errores de solicitud de requests (ej. invalid URL)
         logging.error(f"Error de solicitud al descargar imagen {url}: {e}")
     except Exception as e:
-        # Captura cualquier otro error inesperado
-        logging.error(f"Error inesperado en download_image para {url}: {e}")
-    return None
+        logging.error(f"Error inesperado en descargar_bytes para {url}: {e}")
+    
+    # Si el servidor falla, es preferible una copia caducada a un hueco en el informe
+    if entrada:
+        logging.warning(f"Usando copia caducada de la caché para {url}")
+        return entrada['bytes'], 'caducada'
+    return None, 'error'
+
+def _descargar_con_plazo(url, limite, timeout):
+    """Descarga respetando el plazo compartido: nunca espera más de lo que queda."""
+    restante = limite - time.monotonic()
+    if restante <= 0:
+        logging.error(f"Plazo agotado antes de empezar a descargar {url}")
+        return None
+    return descargar_bytes(url, timeout=min(timeout, restante))
+
+def prefetch_imagenes(urls, deadline=30, timeout=15, al_completar=None):
+    """
+    Descarga en paralelo todas las URLs con un plazo total compartido.
+    Devuelve un dict url -> bytes, con None para las que fallaron o no
+    terminaron dentro del plazo. `al_completar(hechas, total)` se llama
+    cada vez que termina una descarga.
+    """
+    limite = time.monotonic() + deadline
+    futures = {
+        url: _pool_descargas.submit(metricas.en_contexto(_descargar_con_plazo), url, limite, timeout)
+        for url in dict.fromkeys(urls)  # Sin duplicados, conservando el orden
+    }
+    if al_completar:
+        hechas = itertools.count(1)
+        for future in futures.values():
+            future.add_done_callback(lambda _: al_completar(next(hechas), len(futures)))
+    done, _ = wait(futures.values(), timeout=deadline)
+
+    resultados = {}
+    for url, future in futures.items():
+        if future in done:
+            resultados[url] = future.result()
+        else:
+            future.cancel()
+            logging.error(f"Plazo de {deadline}s agotado descargando {url}")
+            metricas.incrementar('pptx_descargas_total', resultado='plazo')
+            resultados[url] = None
+    return resultados
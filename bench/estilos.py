@@ -0,0 +1,75 @@
+"""
+Mide los estilos de texto precompilados (ESTILOS) en los párrafos que
+escribe escribir_parrafo: copiar su XML ya construido frente a asignar
+fuente, tamaño, color, alineación y espaciados con un setter de
+python-pptx por propiedad. Las cajas de noticias se escriben con
+escribir_noticias y no pasan por aquí (ver bench.noticias), así que el
+número de noticias solo cambia cuántas diapositivas de cobertura hay.
+Informa del tiempo de generación por informe y de los nodos XML de las
+diapositivas, que deben coincidir en ambos casos.
+
+    python -m bench.estilos [noticias_por_medio] [repeticiones]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def escribir_parrafo_con_setters(tf, texto, estilo, nuevo=True):
+    """Forma anterior de dar formato a cada párrafo, como referencia."""
+    from app.ppt_generator import FORMATOS_TEXTO, aplicar_formato
+    formato = FORMATOS_TEXTO[estilo]
+    if not nuevo:
+        tf.text = ""
+    p = tf.add_paragraph() if nuevo else tf.paragraphs[0]
+    if formato.get('en_run'):
+        p.add_run().text = texto
+    else:
+        p.text = texto
+    aplicar_formato(p, **formato)
+    return p._p
+
+def nodos_xml(pr):
+    return sum(1 for slide in pr.slides for _ in slide._element.iter())
+
+def medir(generar, payload, repeticiones):
+    from pptx import Presentation
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with generar(payload) as salida:
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    with generar(payload) as salida:
+        pr = Presentation(salida)
+    return statistics.median(tiempos), nodos_xml(pr), len(pr.slides)
+
+def main():
+    noticias = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    os.environ.setdefault("PPTX_LOGO_PATH", os.path.join(tempfile.gettempdir(), "bench_sin_logo_local.png"))
+
+    import logging
+    logging.disable(logging.INFO)
+    from app import ppt_generator
+    from bench.payloads import generar_payload
+
+    payload = generar_payload(noticias, 0, "http://localhost")
+    ppt_generator.generar_pptx(payload).close()  # Calentamiento (plantilla base)
+
+    precompilado = medir(ppt_generator.generar_pptx, payload, repeticiones)
+    original = ppt_generator.escribir_parrafo
+    ppt_generator.escribir_parrafo = escribir_parrafo_con_setters
+    try:
+        setters = medir(ppt_generator.generar_pptx, payload, repeticiones)
+    finally:
+        ppt_generator.escribir_parrafo = original
+
+    print(f"{noticias} noticias por medio, {precompilado[2]} diapositivas")
+    for nombre, (mediana, nodos, _) in [("Setters por propiedad", setters), ("Estilos precompilados", precompilado)]:
+        print(f"{nombre:<24} mediana {mediana:7.1f} ms   nodos XML {nodos}")
+    print(f"{'Ahorro':<24}         {setters[0] - precompilado[0]:7.1f} ms "
+          f"({(1 - precompilado[0] / setters[0]) * 100:.0f}%)   nodos XML {setters[1] - precompilado[1]}")
+
+if __name__ == "__main__":
+    main()
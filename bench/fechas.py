@@ -0,0 +1,62 @@
+"""
+Mide formatear_fecha sobre distribuciones de fechas realistas: el
+formato anterior (strptime probando los cuatro formatos en orden) frente
+al despacho por expresión regular, con y sin la caché LRU.
+
+    python -m bench.fechas [noticias]
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from app.modelo import formatear_fecha
+
+def formatear_fecha_strptime(fecha_str):
+    """Implementación anterior, como referencia."""
+    if not fecha_str or fecha_str == 'N/A':
+        return 'N/A'
+    for formato in ['%Y-%m-%d', '%d-%m-%Y', '%Y/%m/%d', '%d/%m/%Y']:
+        try:
+            return datetime.strptime(fecha_str, formato).strftime('%d-%m-%y')
+        except ValueError:
+            continue
+    return fecha_str
+
+def fechas_periodo(noticias, formato, dias=31, semilla=0):
+    """Fechas de un informe mensual: unos pocos días distintos repetidos muchas veces."""
+    aleatorio = random.Random(semilla)
+    inicio = date(2024, 3, 1)
+    return [(inicio + timedelta(days=aleatorio.randrange(dias))).strftime(formato) for _ in range(noticias)]
+
+def medir(func, fechas, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for fecha in fechas:
+            func(fecha)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) / len(fechas) * 1e6
+
+def main():
+    noticias = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    escenarios = {
+        "YYYY-MM-DD": fechas_periodo(noticias, '%Y-%m-%d'),
+        "DD/MM/YYYY": fechas_periodo(noticias, '%d/%m/%Y'),
+        "mezcla de formatos": [
+            fecha for formato in ('%Y-%m-%d', '%d-%m-%Y', '%Y/%m/%d', '%d/%m/%Y')
+            for fecha in fechas_periodo(noticias // 4, formato)
+        ],
+        "un año, días distintos": fechas_periodo(noticias, '%d/%m/%Y', dias=365),
+    }
+    sin_cache = formatear_fecha.__wrapped__
+
+    print(f"{'escenario':<24} | {'strptime':>9} {'regex':>9} {'regex+LRU':>10}  (µs por fecha)")
+    for nombre, fechas in escenarios.items():
+        assert [formatear_fecha_strptime(f) for f in fechas] == [sin_cache(f) for f in fechas]
+        formatear_fecha.cache_clear()
+        print(f"{nombre:<24} | {medir(formatear_fecha_strptime, fechas):>9.2f} "
+              f"{medir(sin_cache, fechas):>9.2f} {medir(formatear_fecha, fechas):>10.2f}")
+
+if __name__ == "__main__":
+    main()
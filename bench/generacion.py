@@ -0,0 +1,125 @@
+"""
+Benchmark de extremo a extremo de generar_pptx.
+
+Genera payloads sintéticos (noticias por medio y número de gráficos
+variables), sirve los gráficos y el logo desde un servidor local con
+latencia configurable e informa de latencia p50/p95/p99, informes por
+segundo, RSS máximo y tiempo por fase.
+
+    python -m bench.generacion --noticias 4,50,200 --urls 0,8,16 --informes 20
+"""
+import argparse
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+def rss_maximo_mb():
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def instrumentar_fases(ppt_generator, tiempos):
+    """Envuelve las funciones de cada fase para acumular su duración."""
+    fases = {
+        'clonar_base': 'nueva_presentacion',
+        'portada': 'crear_portada',
+        'cobertura': 'crear_datos_cobertura',
+        'vpe_totales': 'crear_vpe_totales',
+        'descarga_graficos': 'prefetch_imagenes',
+        'diapositivas_graficos': 'crear_diapositiva_grafico',
+    }
+    for fase, nombre in fases.items():
+        original = getattr(ppt_generator, nombre)
+
+        def envoltura(*args, _original=original, _fase=fase, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                tiempos[_fase].append(time.perf_counter() - inicio)
+
+        setattr(ppt_generator, nombre, envoltura)
+
+def ejecutar_escenario(generar_pptx, payloads, concurrencia):
+    latencias = []
+    tamanos = []
+
+    def un_informe(payload):
+        inicio = time.perf_counter()
+        with generar_pptx(payload) as salida:
+            salida.seek(0, os.SEEK_END)
+            tamanos.append(salida.tell())
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(un_informe, payloads))
+    total = time.perf_counter() - inicio
+    return latencias, tamanos, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--noticias', default="4,50,200", help="Noticias por medio, separadas por comas")
+    parser.add_argument('--urls', default="0,8", help="Número de gráficos por informe, separados por comas")
+    parser.add_argument('--informes', type=int, default=10, help="Informes por escenario")
+    parser.add_argument('--concurrencia', type=int, default=1, help="Informes generados en paralelo")
+    parser.add_argument('--latencia', type=float, default=0.05, help="Latencia del servidor de gráficos (s)")
+    parser.add_argument('--cache', action='store_true', help="Reutilizar URLs entre informes (la caché actúa)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # Los logs por imagen distorsionan la medición
+
+    # Aislar el benchmark de la caché en disco y del logo real antes de importar la app
+    os.environ.setdefault("PPTX_CACHE_DIR", tempfile.mkdtemp(prefix="bench_cache_"))
+    os.environ.setdefault("PPTX_LOGO_PATH", os.path.join(tempfile.gettempdir(), "bench_sin_logo_local.png"))
+
+    from bench.payloads import generar_payload
+    from bench.servidor import ServidorGraficos
+
+    with ServidorGraficos(latencia=args.latencia) as servidor:
+        from app import logo, ppt_generator
+        logo.LOGO_URLS = [f"{servidor.url}/logo.png"]
+        logo.precargar_logo()
+        while logo.obtener_logo() is None:
+            time.sleep(0.01)
+
+        tiempos = defaultdict(list)
+        instrumentar_fases(ppt_generator, tiempos)
+        ppt_generator.generar_pptx(generar_payload(1, 0, servidor.url)).close()  # Calentamiento
+
+        print(f"{'noticias':>8} {'urls':>4} | {'p50':>7} {'p95':>7} {'p99':>7} | {'inf/s':>6} | "
+              f"{'KiB':>6} | {'RSS MB':>6} | {'peticiones':>10}")
+        for noticias in [int(n) for n in args.noticias.split(",")]:
+            for num_urls in [int(n) for n in args.urls.split(",")]:
+                payloads = [
+                    generar_payload(noticias, num_urls, servidor.url,
+                                    sufijo="" if args.cache else f"?r={time.time_ns()}_{i}", semilla=i)
+                    for i in range(args.informes)
+                ]
+                tiempos.clear()
+                peticiones_antes = servidor.peticiones
+                latencias, tamanos, total = ejecutar_escenario(ppt_generator.generar_pptx, payloads, args.concurrencia)
+                print(f"{noticias:>8} {num_urls:>4} | "
+                      f"{percentil(latencias, 50) * 1000:>6.0f}ms {percentil(latencias, 95) * 1000:>6.0f}ms "
+                      f"{percentil(latencias, 99) * 1000:>6.0f}ms | {len(latencias) / total:>6.2f} | "
+                      f"{statistics.mean(tamanos) / 1024:>6.0f} | {rss_maximo_mb():>6.0f} | "
+                      f"{servidor.peticiones - peticiones_antes:>10}")
+                por_fase = {fase: sum(valores) / len(latencias) for fase, valores in tiempos.items()}
+                por_fase['guardado_y_resto'] = statistics.mean(latencias) - sum(por_fase.values())
+                fases = ", ".join(f"{fase} {segundos * 1000:.1f}ms" for fase, segundos in por_fase.items())
+                print(f"{'':>15} fases por informe: {fases}")
+
+if __name__ == "__main__":
+    main()
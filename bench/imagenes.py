@@ -0,0 +1,78 @@
+"""
+Mide la optimización de gráficos antes de incrustarlos: tamaño del .pptx
+y tiempo de generación incrustando los PNG a resolución de origen frente a
+reescalados al marco (PPTX_IMAGENES_DPI), con la caché vacía y llena. Se
+mide con gráficos de colores planos (pasan a paleta sin pérdidas) y con
+bordes suavizados (más de 256 colores: PNG reescalado).
+
+    python -m bench.imagenes [ancho_px] [graficos]
+"""
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from PIL import Image, ImageDraw
+
+def grafico_barras(ancho, alto, semilla, suavizado=True):
+    """PNG de colores planos, con antialiasing en los bordes salvo suavizado=False."""
+    aleatorio = random.Random(semilla)
+    img = Image.new('RGB', (ancho, alto), 'white')
+    dibujo = ImageDraw.Draw(img)
+    barras = 10
+    for i in range(barras):
+        x = ancho * (i + 0.2) / barras
+        y = alto * (1 - aleatorio.uniform(0.2, 0.9))
+        dibujo.rectangle([x, y, x + ancho * 0.6 / barras, alto * 0.95], fill=(0, 51, 102))
+        dibujo.text((x, y - 40), f"{aleatorio.randint(1000, 99999)}", fill='black')
+    for i in range(barras * 4):
+        dibujo.line([0, alto * i / (barras * 4), ancho, alto * i / (barras * 4)], fill=(220, 220, 220), width=2)
+    if suavizado:
+        img = img.resize((ancho * 2, alto * 2)).resize((ancho, alto), Image.LANCZOS)
+    salida = io.BytesIO()
+    img.save(salida, 'PNG')
+    return salida.getvalue()
+
+def medir(generar, payload, imagenes, repeticiones=5):
+    tiempos, tamano = [], 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with generar(payload, imagenes=imagenes) as salida:
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            tamano = len(salida.read())
+    return statistics.median(tiempos), tamano
+
+def main():
+    ancho = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    graficos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    os.environ.setdefault("PPTX_LOGO_PATH", os.path.join(tempfile.gettempdir(), "bench_sin_logo_local.png"))
+
+    import logging
+    logging.disable(logging.INFO)
+    from app import optimizacion_imagenes, ppt_generator
+    from bench.payloads import generar_payload
+
+    payload = generar_payload(5, graficos, "http://localhost")
+    # La optimización es opcional (PPTX_IMAGENES_DPI=0 por defecto): se mide a 150 DPI si no se indica otra
+    dpi = optimizacion_imagenes.IMAGENES_DPI or 150
+    for tipo, suavizado in [("planos", False), ("suavizados", True)]:
+        imagenes = {url: grafico_barras(ancho, ancho * 5 // 8, i, suavizado) for i, url in enumerate(payload[0]['urls'])}
+        origen = sum(len(contenido) for contenido in imagenes.values())
+        print(f"{graficos} gráficos {tipo} de {ancho}px, {origen / 1024:.0f} KiB descargados")
+
+        optimizacion_imagenes.IMAGENES_DPI = 0
+        sin_optimizar = medir(ppt_generator.generar_pptx, payload, imagenes)
+        optimizacion_imagenes.IMAGENES_DPI = dpi
+        optimizacion_imagenes._cache.clear()
+        primera = medir(ppt_generator.generar_pptx, payload, imagenes, repeticiones=1)
+        con_cache = medir(ppt_generator.generar_pptx, payload, imagenes)
+
+        for nombre, (mediana, tamano) in [("Resolución de origen", sin_optimizar),
+                                          (f"{dpi:.0f} DPI, caché vacía", primera),
+                                          (f"{dpi:.0f} DPI, caché llena", con_cache)]:
+            print(f"  {nombre:<24} mediana {mediana:8.1f} ms   .pptx {tamano / 1024:8.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Mide la lectura incremental del cuerpo (miembros_informe) frente a
+json.loads sobre el cuerpo entero, con trozos como los de la red y con un
+valor muy grande partido en trozos pequeños. Comprueba antes que, con
+cualquier tamaño de trozo, acepta y rechaza lo mismo que json.loads y
+devuelve los mismos miembros.
+
+    python -m bench.ingesta [noticias_por_medio] [repeticiones]
+"""
+import json
+import statistics
+import sys
+import time
+from app.ingesta import miembros_informe
+
+# Cuerpos válidos para json.loads; los que no son un informe deben rechazarse igual
+CASOS = [
+    '{}',
+    ' \n{"a": 1}\t\r\n ',
+    '[{"a": [1, 2.5e3, -0, true, false, null]}]',
+    '[{"a": 1}, {"b": 2}, [3], "x", 4]',
+    '{"a": "comillas \\" y barras \\\\", "b\\"": {"c": "}]{["}}',
+    '{"a": "\\u00e1\\ud83d\\ude00 ñ 😀", "b": "\\\\\\\\", "c": "\\\\"}',
+    '{"a": {"b": {"c": [[], {}, [{}]]}}, "a": 2}',
+    '{"num": 12345678901234567890, "neg": -1.5E-3}',
+]
+# Cuerpos que json.loads rechaza
+INVALIDOS = [
+    '', '   ', '{', '{"a": 1', '{"a": 1} x', '{"a": 1}}', '{"a": 1} {"b": 2}',
+    '[{"a": 1}', '[{"a": 1}] 5', '[{"a": 1},]', '[{"a": 1}, {]', '{"a": "sin cerrar}',
+    '{"a": tru}', '{"a": 01}', '{"a": 1,}', '{1: 2}', '{"a" 1}', '{"a": "\\x"}',
+    '{"a": "barra final \\', '{"a": "línea\ncortada"}',
+]
+
+def trocear(texto, tamano):
+    datos = texto.encode('utf-8')
+    return [datos[i:i + tamano] for i in range(0, len(datos), tamano)] or [b'']
+
+def leer(trozos):
+    """Miembros del informe como lista de pares, o la excepción si se rechaza."""
+    try:
+        return list(miembros_informe(trozos))
+    except ValueError as e:
+        return e
+
+def comprobar_equivalencia():
+    for texto in CASOS + INVALIDOS:
+        try:
+            esperado = json.loads(texto)
+        except ValueError:
+            esperado = None
+        if isinstance(esperado, list):
+            esperado = esperado[0] if esperado else None
+        for tamano in (1, 2, 3, 7, 64, len(texto.encode('utf-8')) or 1):
+            obtenido = leer(trocear(texto, tamano))
+            if not isinstance(esperado, dict):
+                assert isinstance(obtenido, ValueError), (texto, tamano, obtenido)
+            else:
+                # json.loads se queda con la última clave repetida
+                assert not isinstance(obtenido, Exception), (texto, tamano, obtenido)
+                assert dict(obtenido) == esperado, (texto, tamano, obtenido)
+    return len(CASOS) + len(INVALIDOS)
+
+def medir(func, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def main():
+    noticias = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    from bench.payloads import generar_payload
+
+    print(f"{comprobar_equivalencia()} cuerpos, mismos resultados que json.loads con cualquier trozo")
+
+    cuerpo = json.dumps(generar_payload(noticias, 8, "http://localhost")).encode('utf-8')
+    cadena = json.dumps({"nota": "x" * (16 * 1024 * 1024)}).encode('utf-8')
+    escenarios = [
+        (f"informe de {len(cuerpo) / 1e6:.1f} MB, trozos de 64 KiB", cuerpo, 64 * 1024),
+        (f"cadena de {len(cadena) / 1e6:.1f} MB, trozos de 4 KiB", cadena, 4 * 1024),
+    ]
+    for nombre, datos, tamano in escenarios:
+        trozos = [datos[i:i + tamano] for i in range(0, len(datos), tamano)]
+        incremental = medir(lambda: list(miembros_informe(trozos)), repeticiones)
+        completo = medir(lambda: json.loads(b''.join(trozos)), repeticiones)
+        print(f"{nombre:<40} incremental {incremental:8.1f} ms   json.loads {completo:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
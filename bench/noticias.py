@@ -0,0 +1,91 @@
+"""
+Mide la escritura de las cajas de noticias: el fragmento XML generado con
+PLANTILLAS_NOTICIAS frente a escribir_parrafo + enlazar_parrafo noticia a
+noticia. Comprueba antes que las diapositivas (XML y relaciones) son
+idénticas, también con textos que necesitan escape.
+
+    python -m bench.noticias [noticias_por_medio] [repeticiones]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def enlazar_parrafo(tf, p, direccion):
+    """Añade un hipervínculo externo a los runs de un párrafo escrito con escribir_parrafo."""
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+    rId = tf.part.relate_to(direccion, RT.HYPERLINK, is_external=True)
+    for r in p.r_lst:
+        r.get_or_add_rPr().add_hlinkClick(rId)
+
+def escribir_noticias_por_parrafo(tf, noticias):
+    """Forma anterior de escribir la caja de noticias, como referencia."""
+    from app.ppt_generator import escribir_parrafo, linea_titular, linea_titulo
+    escribir_parrafo(tf, "📰 Noticias Destacadas", 'encabezado_noticias', nuevo=False)
+    for noticia in noticias:
+        escribir_parrafo(tf, linea_titulo(noticia), 'titulo_noticia')
+        p = escribir_parrafo(tf, linea_titular(noticia), 'titular_noticia')
+        if noticia.enlace:
+            enlazar_parrafo(tf, p, noticia.enlace)
+
+def diapositivas(pr):
+    """XML y relaciones de cada diapositiva, para comparar dos presentaciones."""
+    from lxml import etree
+    return [
+        (etree.tostring(slide._element),
+         sorted((rId, rel.reltype, rel.target_ref) for rId, rel in slide.part.rels.items()))
+        for slide in pr.slides
+    ]
+
+def payload_con_escapes():
+    from bench.payloads import generar_payload
+    payload = generar_payload(12, 0, "http://localhost")
+    noticias = payload[0]["TV_raw"]["noticias"]
+    noticias[0]["titular"] = "Fusión A&B <confirmada> \"hoy\""
+    noticias[1]["titulo"] = "Línea uno\nlínea dos\vtres"
+    noticias[2]["titular"] = "Control\x07y\rretorno\ttab"
+    noticias[3]["url"] = ""
+    noticias[4]["url"] = noticias[5]["url"]  # Enlace repetido: misma relación
+    noticias[6]["titular"] = ""
+    return payload
+
+def medir(generar, payload, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        generar(payload).close()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def main():
+    noticias = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    os.environ.setdefault("PPTX_LOGO_PATH", os.path.join(tempfile.gettempdir(), "bench_sin_logo_local.png"))
+
+    import logging
+    logging.disable(logging.INFO)
+    from pptx import Presentation
+    from app import ppt_generator
+    from bench.payloads import generar_payload
+
+    payload = generar_payload(noticias, 0, "http://localhost")
+    plantillas = ppt_generator.escribir_noticias
+    resultados = {}
+    for nombre, escribir in [("Párrafo a párrafo", escribir_noticias_por_parrafo), ("Plantillas XML", plantillas)]:
+        ppt_generator.escribir_noticias = escribir
+        try:
+            comparadas = [diapositivas(Presentation(ppt_generator.generar_pptx(p))) for p in (payload, payload_con_escapes())]
+            resultados[nombre] = medir(ppt_generator.generar_pptx, payload, repeticiones), comparadas
+        finally:
+            ppt_generator.escribir_noticias = plantillas
+
+    (lento, referencia), (rapido, obtenidas) = resultados.values()
+    print(f"{noticias} noticias por medio, {len(referencia[0])} diapositivas, "
+          f"diapositivas idénticas: {'sí' if referencia == obtenidas else 'NO'}")
+    for nombre, (mediana, _) in resultados.items():
+        print(f"{nombre:<20} mediana {mediana:8.1f} ms")
+    print(f"{'Ahorro':<20}         {lento - rapido:8.1f} ms ({(1 - rapido / lento) * 100:.0f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Payloads sintéticos con la misma forma que los que envía el pipeline."""
+import random
+
+MEDIOS = ["TV", "Radio", "Prensa", "Medios Digitales"]
+
+GRAFICOS = [
+    "vpe_barra", "vpe_torta", "impactos_barra", "impactos_torta",
+    "top10_vpe_prensa", "top10_vpe_radio", "top10_vpe_tv", "top10_vpe_medios_digitales",
+]
+
+FORMATOS_FECHA = ["{a}-{m:02d}-{d:02d}", "{d:02d}/{m:02d}/{a}", "{d:02d}-{m:02d}-{a}", "{a}/{m:02d}/{d:02d}"]
+
+def generar_noticias(cantidad, medio, rnd):
+    noticias = []
+    for i in range(cantidad):
+        fecha = rnd.choice(FORMATOS_FECHA).format(a=2024, m=rnd.randint(1, 3), d=rnd.randint(1, 28))
+        noticias.append({
+            "fecha": fecha,
+            "titulo": f"{medio} {rnd.choice(['Nacional', 'Regional', 'Local'])} {i}",
+            "titular": " ".join(rnd.choice(["Empresa", "anuncia", "nuevo", "acuerdo", "con", "resultados",
+                                             "récord", "en", "el", "trimestre"]) for _ in range(rnd.randint(6, 16))),
+            "url": f"https://noticias.example.com/{medio.lower().replace(' ', '-')}/{i}",
+        })
+    return noticias
+
+def generar_payload(noticias_por_medio, num_urls, base_url, sufijo="", semilla=0):
+    """
+    Payload con `noticias_por_medio` noticias en cada bloque {medio}_raw y
+    `num_urls` URLs de gráficos servidas por `base_url`. `sufijo` permite
+    forzar URLs distintas entre informes para que no actúe la caché.
+    """
+    rnd = random.Random(semilla)
+    datos = {
+        "fechaInicial": "2024-01-01",
+        "fechaFinal": "2024-03-31",
+        "totalGlobalVPE": f"{rnd.randint(100000, 9999999):,}".replace(",", "."),
+        "urls": [
+            f"{base_url}/{GRAFICOS[i % len(GRAFICOS)]}_{i}.png{sufijo}"
+            for i in range(num_urls)
+        ],
+    }
+    for medio in MEDIOS:
+        datos[f"{medio}_raw"] = {
+            "cantidad_noticias": noticias_por_medio,
+            "total_audiencia": f"{rnd.randint(1000, 999999):,}".replace(",", "."),
+            "total_vpe": f"{rnd.randint(1000, 999999):,}".replace(",", "."),
+            "total_vc": f"{rnd.randint(1000, 999999):,}".replace(",", "."),
+            "noticias": generar_noticias(noticias_por_medio, medio, rnd),
+        }
+    return [datos]
@@ -0,0 +1,33 @@
+"""
+Mide el coste de preparar la presentación de cada solicitud:
+Presentation() desde cero frente a clonar la presentación base.
+
+    python -m bench.plantilla [repeticiones]
+"""
+import statistics
+import sys
+import time
+from pptx import Presentation
+from app.ppt_generator import nueva_presentacion, obtener_plantilla
+
+def medir(func, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), max(tiempos)
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    obtener_plantilla()  # La base se construye una vez al arrancar, fuera de la medición
+
+    for nombre, func in [
+        ("Presentation() desde cero", Presentation),
+        ("Clon de la base", nueva_presentacion),
+    ]:
+        mediana, maximo = medir(func, repeticiones)
+        print(f"{nombre:<28} mediana {mediana:6.2f} ms   máx {maximo:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Servidor HTTP local que sustituye al servidor de gráficos y a mmi-e.com
+durante los benchmarks. Sirve PNG sintéticos con una latencia configurable.
+"""
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+
+def generar_png(ancho, alto, color=(0, 132, 209)):
+    """PNG de color plano con unas bandas, parecido a un gráfico de barras."""
+    img = Image.new('RGB', (ancho, alto), (255, 255, 255))
+    paso = max(ancho // 12, 1)
+    for i in range(0, ancho - paso, paso * 2):
+        img.paste(color, (i, alto // 3, i + paso, alto))
+    salida = io.BytesIO()
+    img.save(salida, 'PNG')
+    return salida.getvalue()
+
+class ServidorGraficos:
+    """Arranca el servidor en un hilo; `latencia` son los segundos de espera por respuesta."""
+
+    def __init__(self, latencia=0.05, ancho=1600, alto=900, puerto=0):
+        self.latencia = latencia
+        self.peticiones = 0
+        self.grafico = generar_png(ancho, alto)
+        self.logo = generar_png(512, 512, color=(0, 61, 125))
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                servidor.peticiones += 1
+                time.sleep(servidor.latencia)
+                contenido = servidor.logo if 'logo' in self.path else servidor.grafico
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(contenido)))
+                self.end_headers()
+                self.wfile.write(contenido)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(('127.0.0.1', puerto), Manejador)
+        self._http.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._http.shutdown()
+        self._http.server_close()